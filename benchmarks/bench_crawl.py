@@ -0,0 +1,174 @@
+# End-to-end benchmark: a full crawl of the local cache server (benchmarks/cache_server.py),
+# w the settings of config.ini (some can be overridden below), started from scratch.
+# Run from the project root: python -m benchmarks.bench_crawl [--threads 4] [--fetch-mode async] ...
+# Reports startup time, pages/s, CPU per page, peak memory & the kinds of pages fetched
+# (regular, trap, duplicate, ...). --json appends the results to a file, one line per run.
+# The crawl's files (frontier, stats log, Logs/, metrics) go to a temporary directory, or
+# to --workdir, where --resume times a restart from the saved frontier. With --response-cache
+# a second run (or one w --replay) re-processes the cached pages instead of downloading them.
+
+import os, sys, json, time, shutil, argparse, resource, tempfile, multiprocessing
+from configparser import ConfigParser
+
+import requests
+
+from benchmarks import cache_server
+from utils import configure_logging, stop_logging
+from utils.config import Config
+from utils.metrics import metrics
+from crawler import Crawler
+from crawler.worker import Worker
+from crawler.async_worker import AsyncWorker
+from crawler.distributed import run_distributed
+import scraper
+
+
+def start_server(args):
+    """ Runs the cache server in a process of its own, so its CPU isn't counted as the
+        crawler's. Returns: (process, port, seed urls)
+    """
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(
+        target=cache_server.serve,
+        args=(args.hosts, args.pages, args.trap_rate, args.seed, 0, args.latency, ready),
+        daemon=True)
+    process.start()
+    port, seeds = ready.get()
+    return process, port, seeds
+
+
+def cpu_seconds() -> float:
+    """ CPU time (user + system) of this process & its finished children (parse pool,
+        partitions).
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def load_config(args, port, seeds):
+    cparser = ConfigParser()
+    cparser.read(args.config)
+    cparser.set("CONNECTION", "CACHE_SERVER", f"127.0.0.1:{port}")
+    cparser.set("CRAWLER", "SEEDURL", ",".join(seeds))
+    cparser.set("CRAWLER", "POLITENESS", str(args.politeness))
+    cparser.set("LOCAL PROPERTIES", "SAVE", "frontier.db")
+    for section, option, value in (
+            ("LOCAL PROPERTIES", "THREADCOUNT", args.threads),
+            ("LOCAL PROPERTIES", "PARSE_PROCESSES", args.parse_processes),
+            ("CRAWLER", "FETCH_MODE", args.fetch_mode),
+            ("CRAWLER", "PRIORITY", args.priority),
+            ("CRAWLER", "PARTITIONS", args.partitions),
+            ("RESPONSE_CACHE", "DIRECTORY", args.response_cache and os.path.abspath(args.response_cache)),
+            ("RESPONSE_CACHE", "MODE", "replay" if args.replay else None)):
+        if value is not None:
+            if not cparser.has_section(section):
+                cparser.add_section(section)
+            cparser.set(section, option, str(value))
+    if not cparser.has_section("METRICS"):
+        cparser.add_section("METRICS")
+    cparser.set("METRICS", "METRICS_FILE", "Logs/metrics.json")
+    return cparser
+
+
+def crawl(config, restart) -> dict:
+    """ Crawls like launch.py does. Returns: startup & crawl seconds and pages fetched """
+    if restart and os.path.exists(scraper.STATS_LOG):
+        os.remove(scraper.STATS_LOG)
+    start = time.perf_counter()
+    if config.partitions > 1:
+        stats_logs = run_distributed(config, restart, config.partitions)
+        crawled = time.perf_counter() - start
+        scraper.load_stats(*stats_logs)
+        return {"startup_s": None, "crawl_s": crawled, "pages": None,
+                "unique_pages": len(scraper.stats["unique_pgs"])}
+    worker_factory = AsyncWorker if config.fetch_mode == "async" else Worker
+    crawler = Crawler(config, restart, worker_factory=worker_factory)
+    started = time.perf_counter()
+    crawler.start()
+    scraper.save_stats_log()
+    finished = time.perf_counter()
+    return {
+        "startup_s": started - start,
+        "crawl_s": finished - started,
+        "pages": metrics.counters.get("pages", 0),
+        "unique_pages": len(scraper.stats["unique_pgs"]),
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=200, help="regular pages per host")
+    parser.add_argument("--trap-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    parser.add_argument("--politeness", type=float, default=0.0)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--parse-processes", type=int)
+    parser.add_argument("--fetch-mode", choices=("threads", "async"))
+    parser.add_argument("--priority", choices=("depth", "fairness", "score"))
+    parser.add_argument("--partitions", type=int)
+    parser.add_argument("--response-cache", help="directory of the response cache to use")
+    parser.add_argument("--replay", action="store_true", help="only replay the response cache")
+    parser.add_argument("--workdir", help="keep the crawl's files here (default: a temporary dir)")
+    parser.add_argument("--resume", action="store_true", help="resume the crawl saved in --workdir")
+    parser.add_argument("--json", help="append the results to this file")
+    args = parser.parse_args(argv)
+    assert not args.resume or args.workdir, "--resume needs --workdir"
+    assert not args.replay or args.response_cache, "--replay needs --response-cache"
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="bench_crawl_"))
+    os.makedirs(workdir, exist_ok=True)
+    server, port, seeds = start_server(args)
+    cparser = load_config(args, port, seeds)
+
+    # the crawl's files go to workdir (partition processes import scraper there, which
+    # reads stopwords.txt)
+    shutil.copy("stopwords.txt", workdir)
+    os.chdir(workdir)
+    config = Config(cparser)
+    configure_logging(config)
+
+    cpu = cpu_seconds()
+    results = crawl(config, restart=not args.resume)
+    cpu = cpu_seconds() - cpu
+    served = requests.get(f"http://127.0.0.1:{port}/stats").json()
+    server.terminate()
+    stop_logging()
+
+    fetched = results["pages"] or served.get("total", 0)
+    results.update({
+        "fetch_mode": config.fetch_mode,
+        "threads": config.threads_count,
+        "parse_processes": config.parse_processes,
+        "partitions": config.partitions,
+        "priority": config.priority,
+        "pages_per_s": fetched / results["crawl_s"] if results["crawl_s"] else 0.0,
+        "cpu_ms_per_page": cpu * 1e3 / fetched if fetched else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "served": served,
+        "workdir": workdir,
+    })
+    print(f"corpus        {args.hosts} hosts x {args.pages} pages, trap rate {args.trap_rate}")
+    print(f"crawler       {config.fetch_mode}, {config.threads_count} threads, "
+          f"{config.parse_processes} parse processes, {config.partitions} partitions, "
+          f"priority {config.priority}")
+    if results["startup_s"] is not None:
+        print(f"startup       {results['startup_s'] * 1e3:9.1f} ms")
+    print(f"crawl         {results['crawl_s']:9.2f} s, {fetched} pages fetched, "
+          f"{results['unique_pages']} unique pages in the stats")
+    print(f"throughput    {results['pages_per_s']:9.1f} pages/s")
+    print(f"cpu           {results['cpu_ms_per_page']:9.2f} ms/page")
+    print(f"peak memory   {results['peak_rss_mb']:9.1f} MB (crawler process)")
+    print(f"served        " + ", ".join(f"{kind} {count}" for kind, count in sorted(served.items())))
+    if json_path:
+        with open(json_path, "a") as file:
+            file.write(json.dumps(results) + "\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,61 @@
+# Benchmark: scraper.count_words (Counter over one split) vs the original tokenize + update_word_counts.
+# Run from the project root: python -m benchmarks.bench_tokenizer [html files...]
+# Without files, pages are made from the stats.json vocabulary w punctuation, numbers & stop words mixed in.
+
+import sys, json, random, string, timeit
+import scraper
+from utils.page import parse_page
+
+
+def legacy_tokenize(text: str):
+    return [word.lower().strip(string.punctuation) for word in text.split() if word.strip(string.punctuation)] # filter out empty strs
+
+def legacy_count_words(text: str) -> dict:
+    """ The original tokenize + update_word_counts loop, kept as the reference implementation. """
+    page_counts = {}
+    for token in legacy_tokenize(text):
+        token = token.strip()
+        if token and len(token) > 1 and any(c.isalpha() for c in token) and token not in scraper.STOP_WORDS and not token.isnumeric():
+            page_counts[token] = page_counts.get(token, 0) + 1
+    return page_counts
+
+
+def load_pages(paths, count=200, words_per_page=1500) -> list:
+    """ Page texts from html files, or synthetic pages if no files are given. """
+    if paths:
+        texts = []
+        for path in paths:
+            with open(path, "rb") as file:
+                texts.append(parse_page(file.read()).text)
+        return texts
+    with open("stats.json", "r", encoding="utf-8") as file:
+        word_counts = json.load(file)["word_counts"]
+    rng = random.Random(0)
+    vocab = list(word_counts) + sorted(scraper.STOP_WORDS)
+    weights = list(word_counts.values()) + [max(word_counts.values())] * len(scraper.STOP_WORDS)
+    extras = ["2024", "(see", "it's", "--", "Home|", "U.S.", "½", "e-mail:", "...", "x"]
+    pages = []
+    for _ in range(count):
+        words = rng.choices(vocab, weights, k=words_per_page) + rng.choices(extras, k=words_per_page // 10)
+        rng.shuffle(words)
+        pages.append(" ".join(word.capitalize() if rng.random() < 0.2 else word for word in words))
+    return pages
+
+
+def main(paths=(), repeat=5):
+    pages = load_pages(paths)
+    for text in pages:
+        assert scraper.count_words(text) == legacy_count_words(text)
+        assert list(scraper.count_words(text).items()) == list(legacy_count_words(text).items())
+        assert scraper.tokenize(text) == legacy_tokenize(text)
+
+    words = sum(len(text.split()) for text in pages)
+    legacy = min(timeit.repeat(lambda: [legacy_count_words(text) for text in pages], number=1, repeat=repeat))
+    new = min(timeit.repeat(lambda: [scraper.count_words(text) for text in pages], number=1, repeat=repeat))
+    print(f"{len(pages)} pages, {words} words, counts identical")
+    print(f"legacy tokenize + count  {legacy * 1e3 / len(pages):7.3f} ms/page")
+    print(f"count_words              {new * 1e3 / len(pages):7.3f} ms/page ({legacy / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
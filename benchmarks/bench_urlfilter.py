@@ -0,0 +1,117 @@
+# Micro-benchmark: utils.urlfilter.UrlFilter (scraper.is_valid) vs the original is_valid.
+# Run from the project root: python -m benchmarks.bench_urlfilter [stats.json]
+
+import re, sys, json, timeit
+from urllib.parse import urlparse
+import scraper
+
+
+def legacy_is_valid(url: str) -> bool:
+    """ The original scraper.is_valid, kept as the reference implementation. """
+    try:
+        parsed = urlparse(url)
+
+        # Valid for only http/https
+        if parsed.scheme not in set(["http", "https"]):
+            return False
+        
+        # if http or https appears twice --> malformed URL
+        if parsed.path.count("http") > 0 or parsed.path.count("https") > 0:
+            return False
+
+        # Use hostname for domain
+        if not parsed.hostname:
+            return False
+
+        # Valid for allowed domains
+        allowed_domains = [
+            "ics.uci.edu",
+            "cs.uci.edu",
+            "informatics.uci.edu",
+            "stat.uci.edu"
+        ]
+
+        # Check if the domain matches the allowed domains
+        if not any (parsed.hostname == domain or parsed.hostname.endswith("." + domain) for domain in allowed_domains):
+            return False
+
+        # Check for bad files
+        if re.match(
+            r".*\.(css|js|bmp|gif|jpe?g|jpg|ico" #added jpg
+            + r"|png|img|tiff?|mid|mp2|mp3|mp4|mpg" # added mpg, img
+            + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf|txt" # added txt
+            + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names|ppsx|pps" # added ppsx, pps
+            + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso|bib" # added bib
+            + r"|epub|dll|cnf|tgz|sha1|webp|sql" # added webp, sql
+            + r"|thmx|mso|arff|rtf|jar|csv|tsv|sh|war|c|cpp|h|java|py|php|rss" # added tsv, sh, war, c cpp h java py php rss (code files)
+            + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower()):
+            return False
+        
+        # Check for infinite traps & low value/repetitive pages
+        parsed_query = parsed.query.lower()
+        calendar_pattern = re.compile(r"/(fall|spring|winter|summer)-\d{4}-week-\d+") # ex: fall-2025-week-3
+        quarter_pattern = re.compile(r"/(fall|spring|winter|summer)-quarter-week-\d+") # ex: fall-quarter-week-3
+        date_pattern = re.compile(r"/\d{4}([/-]\d{2}){2}$") # ex: 2025-2-06
+        numerical_pattern = re.compile(r"/[a-z]+\d+\.html$") # ex: r25.html
+
+        if "/events/" in parsed.path.lower() or "/event/" in parsed.path.lower() or calendar_pattern.search(parsed.path.lower()) \
+            or date_pattern.search(parsed.path.lower()) or quarter_pattern.search(parsed.path.lower()) \
+            or parsed.path.lower().endswith("week"): # calendar/event/date pattern 
+            return False
+        if "grape" in parsed.hostname: # ton of low-value repetitive content
+            return False
+        if numerical_pattern.search(parsed.path.lower()): # numerical trap 
+            return False
+        if any(param in parsed_query for param in ['do=', 'idx=', 'id=', 'version=', 'from=', 'precision=', 'rev=', 'p=']): # low info value & near-dupe pgs
+            return False
+        if 'requesttracker' in parsed_query or "/page/" in parsed.path.lower() or "junkyard" in parsed.path.lower(): # repeated query params, giving barely any new info
+            return False
+        if '/ml/datasets' in parsed_query or 'datasets' in parsed_query: # filter out large ML datasets
+            return False
+        if "/pub/" in parsed.path.lower() or "publications" in parsed.path.lower() or "/pubs/" in parsed.path.lower(): # low textual content
+            return False
+        if "~dechter/" in parsed.path.lower(): # pg not found and/or low value
+            return False
+        if len(url) > 200: # very long URLs (defined threashold > 200 chars)
+            return False
+        if url.count('?') > 1 or url.count('&') > 4: # lots of ? or &
+            return False
+
+        return True
+
+    except TypeError:
+        print ("TypeError for ", parsed)
+        raise
+
+
+def load_urls(path="stats.json") -> list:
+    """ URLs from a stats file plus variants that hit every rule (traps, extensions, domains). """
+    with open(path, "r", encoding="utf-8") as file:
+        urls = json.load(file)["unique_pgs"]
+    variants = []
+    for url in urls[:2000]:
+        variants += [
+            url + "/paper.PDF", url + "/events/x", url + "?do=edit", url + "/2024-01-02",
+            url + "?a=1&b=2&c=3&d=4&e=5", url.replace("uci.edu", "example.com"),
+            url.replace("https://", "ftp://"), url + "/r25.html", url + "/http://x",
+        ]
+    return urls + variants
+
+
+def main(path="stats.json", repeat=5):
+    urls = load_urls(path)
+    mismatches = [url for url in urls if legacy_is_valid(url) != scraper.is_valid(url)]
+    assert not mismatches, f"{len(mismatches)} mismatches, e.g. {mismatches[:5]}"
+    assert scraper.is_valid_many(urls) == [url for url in urls if legacy_is_valid(url)]
+
+    legacy = min(timeit.repeat(lambda: [legacy_is_valid(url) for url in urls], number=1, repeat=repeat))
+    single = min(timeit.repeat(lambda: [scraper.is_valid(url) for url in urls], number=1, repeat=repeat))
+    batch = min(timeit.repeat(lambda: scraper.is_valid_many(urls), number=1, repeat=repeat))
+    print(f"{len(urls)} urls, results identical")
+    print(f"legacy is_valid     {legacy * 1e6 / len(urls):8.2f} us/url")
+    print(f"UrlFilter.is_valid  {single * 1e6 / len(urls):8.2f} us/url ({legacy / single:.1f}x)")
+    print(f"is_valid_many       {batch * 1e6 / len(urls):8.2f} us/url ({legacy / batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,218 @@
+# Local stand-in for the cache server: speaks the same protocol as the real one
+# (GET /?q=<url>&u=<useragent> -> CBOR {"url", "status", "response": pickled requests.Response})
+# and serves a synthetic corpus, so crawls can run & be measured offline.
+# Run from the project root: python -m benchmarks.cache_server [--port 9000] [--hosts 20] ...
+# then set CACHE_SERVER = 127.0.0.1:9000 in config.ini and SEEDURL to the printed seeds.
+
+import re, sys, json, time, pickle, random, argparse, threading
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import cbor
+import requests
+
+VOCABULARY = [
+    "".join(random.Random(i).choice("abcdefghijklmnopqrstuvwxyz") for _ in range(3 + i % 8))
+    for i in range(5000)]
+# Zipf-like word frequencies, like real text
+CUMULATIVE_WEIGHTS = list()
+for rank in range(1, len(VOCABULARY) + 1):
+    CUMULATIVE_WEIGHTS.append((CUMULATIVE_WEIGHTS[-1] if CUMULATIVE_WEIGHTS else 0) + 1 / rank)
+
+
+class SyntheticCorpus(object):
+    """ Deterministic web of `hosts` hosts under ics.uci.edu w `pages` regular pages each.
+        Every url always gets the same page, so runs are comparable. Besides regular pages
+        (/s<section>/doc-<n>, 100-1500 words, links within the host & to other hosts)
+        a share of links go to:
+            trap - infinite spaces the url rules in scraper.py don't know about:
+                /archive?sort=<n> (a new parameter value per page), /a/b/a/b/... (repeated
+                segments) & /feed/<n> (an endless chain of near duplicate pages)
+            calendar - /calendar/yyyy-mm-dd (caught by scraper.PATH_TRAPS)
+            duplicate - /print/... (exact copy of a regular page)
+            short - /tag/<n> (fewer words than scraper.MIN_WORDS)
+            error - /missing/<n> (404) & /files/<n> (not html)
+        Args:
+            hosts, pages - size of the regular part of the corpus
+            trap_rate - share of a page's links that go to the kinds above
+            seed - changes every page
+    """
+    def __init__(self, hosts=20, pages=200, trap_rate=0.1, seed=0):
+        self.hosts = [f"host{i}.ics.uci.edu" for i in range(hosts)]
+        self.pages = pages
+        self.trap_rate = trap_rate
+        self.seed = seed
+
+    def seeds(self) -> list:
+        return [f"https://{host}/s0/doc-0" for host in self.hosts[:4]]
+
+    def _words(self, rng, count) -> str:
+        return " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=count))
+
+    def _regular_link(self, rng, host) -> str:
+        if rng.random() < 0.2: # cross host link
+            host = rng.choice(self.hosts)
+        n = rng.randrange(self.pages)
+        return f"https://{host}/s{n % 10}/doc-{n}"
+
+    def _trap_link(self, rng, host, n) -> str:
+        kind = rng.randrange(7)
+        if kind == 0:
+            return f"https://{host}/archive?sort={n}"
+        if kind == 1:
+            return f"https://{host}/a/b/a/b/a/b/a/doc-{n}"
+        if kind == 2:
+            return f"https://{host}/feed/{n}"
+        if kind == 3:
+            return f"https://{host}/calendar/2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}"
+        if kind == 4:
+            return f"https://{host}/print/s{n % 10}/doc-{n % self.pages}"
+        if kind == 5:
+            return f"https://{host}/tag/{n}"
+        return f"https://{host}/{rng.choice(('missing', 'files'))}/{n}"
+
+    def _links(self, rng, host, n, count) -> list:
+        return [
+            self._trap_link(rng, host, n + i + 1) if rng.random() < self.trap_rate
+            else self._regular_link(rng, host)
+            for i in range(count)]
+
+    def page(self, url) -> tuple:
+        """ Returns: (kind, status, content type, body) of the page at url """
+        parsed = urlparse(url)
+        host, path = parsed.hostname or "", parsed.path
+        rng = random.Random(f"{self.seed} {host} {path}?{parsed.query}")
+        numbers = re.findall(r"\d+", path + "?" + parsed.query)
+        number = int(numbers[-1]) if numbers else 0
+        if host not in self.hosts:
+            return "error", 404, "text/html", b""
+        if path.startswith("/missing/"):
+            return "error", 404, "text/html", b"<p>not found</p>"
+        if path.startswith("/files/"):
+            return "error", 200, "application/octet-stream", rng.randbytes(2000)
+        if path.startswith("/print/"):
+            return ("duplicate",) + self.page(url.replace("/print/", "/", 1))[1:]
+        if path.startswith("/tag/"):
+            return "short", 200, "text/html", f"<p>{self._words(rng, 20)}</p>".encode()
+        if path.startswith("/feed/"):
+            # same text every time but one word, links on to the next one
+            text = self._words(random.Random(f"{self.seed} {host} feed"), 300) + f" item{number}"
+            links = [f"https://{host}/feed/{number + 1}", f"https://{host}/feed/{number + 2}"]
+            kind = "trap"
+        elif path == "/archive" or path.startswith("/a/b/") or path.startswith("/calendar/"):
+            text = self._words(rng, 300)
+            links = [self._trap_link(rng, host, number + 1)] * 2 + self._links(rng, host, number, 3)
+            if path == "/archive":
+                links[0] = f"https://{host}/archive?sort={number + 1}"
+            elif path.startswith("/a/b/"):
+                links[0] = f"https://{host}{path.rsplit('/', 1)[0]}/a/b/doc-{number + 1}"
+            kind = "calendar" if path.startswith("/calendar/") else "trap"
+        elif path.startswith("/s"):
+            text = self._words(rng, rng.randint(100, 1500))
+            links = self._links(rng, host, number, rng.randint(5, 20))
+            kind = "regular"
+        else:
+            return "error", 404, "text/html", b""
+        anchors = "".join(f'<a href="{link}">{rng.choice(VOCABULARY)}</a>' for link in links)
+        body = f"<html><head><title>{host}{path}</title></head><body><p>{text}</p>{anchors}</body></html>"
+        return kind, 200, "text/html; charset=utf-8", body.encode("utf-8")
+
+
+class CacheServer(object):
+    """ The cache server protocol over a SyntheticCorpus, on a background thread.
+        GET /stats answers w the pages served per kind (JSON).
+        Args:
+            corpus - SyntheticCorpus
+            port - 0 picks a free one (see self.port)
+            latency - seconds added to every response, to stand in for the network
+    """
+    def __init__(self, corpus, host="127.0.0.1", port=0, latency=0.0):
+        self.corpus = corpus
+        self.latency = latency
+        self.served = Counter()
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, like the real server
+            def log_message(self, format, *args):
+                pass
+            def do_GET(self):
+                if self.path.startswith("/stats"):
+                    with server.lock:
+                        self.reply(200, json.dumps(server.served).encode("utf-8"))
+                    return
+                query = parse_qs(urlparse(self.path).query)
+                if "q" not in query:
+                    self.reply(400, b"")
+                    return
+                self.reply(200, server.response(query["q"][0]))
+            def reply(self, status, body):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.address = self.httpd.server_address
+        self.port = self.address[1]
+
+    def response(self, url) -> bytes:
+        """ CBOR body for url, what utils.download turns into a utils.response.Response. """
+        if self.latency:
+            time.sleep(self.latency)
+        kind, status, content_type, body = self.corpus.page(url)
+        with self.lock:
+            self.served[kind] += 1
+            self.served["total"] += 1
+        raw = requests.models.Response()
+        raw.status_code = status
+        raw._content = body
+        raw.headers["Content-Type"] = content_type
+        raw.url = url
+        raw.encoding = "utf-8"
+        return cbor.dumps({"url": url, "status": status, "response": pickle.dumps(raw)})
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def serve(hosts=20, pages=200, trap_rate=0.1, seed=0, port=0, latency=0.0, ready=None):
+    """ Runs a CacheServer until interrupted (e.g. in a multiprocessing.Process).
+        ready - multiprocessing.Queue that gets (port, seeds) once the server is up
+    """
+    corpus = SyntheticCorpus(hosts, pages, trap_rate, seed)
+    server = CacheServer(corpus, port=port, latency=latency)
+    if ready is not None:
+        ready.put((server.port, corpus.seeds()))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=200, help="regular pages per host")
+    parser.add_argument("--trap-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    args = parser.parse_args(argv)
+    corpus = SyntheticCorpus(args.hosts, args.pages, args.trap_rate, args.seed)
+    print(f"Serving on 127.0.0.1:{args.port}, SEEDURL = {','.join(corpus.seeds())}")
+    serve(args.hosts, args.pages, args.trap_rate, args.seed, args.port, args.latency)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
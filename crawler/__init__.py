@@ -1,6 +1,9 @@
 from utils import get_logger
+from utils.metrics import metrics, MetricsReporter
 from crawler.frontier import Frontier
 from crawler.worker import Worker
+from crawler.parse_pool import shutdown_parse_pool
+from utils.response_cache import close_response_cache
 
 class Crawler(object):
     def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=Worker):
@@ -9,6 +12,9 @@ class Crawler(object):
         self.frontier = frontier_factory(config, restart)
         self.workers = list()
         self.worker_factory = worker_factory
+        metrics.profile = set(config.profile_stages)
+        self.reporter = MetricsReporter(
+            config.metrics_file, config.metrics_interval, config.metrics_port)
 
     def start_async(self):
         self.workers = [
@@ -16,6 +22,7 @@ class Crawler(object):
             for worker_id in range(self.config.threads_count)]
         for worker in self.workers:
             worker.start()
+        self.reporter.start()
 
     def start(self):
         self.start_async()
@@ -24,3 +31,9 @@ class Crawler(object):
     def join(self):
         for worker in self.workers:
             worker.join()
+        shutdown_parse_pool()
+        close_response_cache()
+        # custom frontiers don't have to persist anything
+        if hasattr(self.frontier, "close"):
+            self.frontier.close()
+        self.reporter.stop()
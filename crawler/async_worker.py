@@ -0,0 +1,103 @@
+import asyncio
+from threading import Semaphore
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp # optional, only needed for FETCH_MODE = async
+except ImportError:
+    aiohttp = None
+
+from crawler.worker import Worker
+from crawler.parse_pool import submit_page
+from utils.download import download_async
+from utils.metrics import metrics
+import scraper
+
+# threads per AsyncWorker for the blocking work of its tasks: parsing (w/o a parse
+# pool), the frontier's store & the response cache
+WORK_THREADS = 4
+
+
+class AsyncWorker(Worker):
+    ''' Worker that runs an asyncio event loop with config.async_tasks fetch tasks.
+        All tasks share one aiohttp session, so connections to the cache server are
+        pooled & kept alive, and many downloads are in flight per thread.
+        Politeness is still the frontier's job: a task only gets a url once its host
+        is ready, the same as the threaded Worker.
+        Only downloads run on the event loop. One feeder thread takes urls from the
+        frontier (get_tbd_url blocks) whenever a task is free, and parsing, the
+        frontier's add_urls/mark_url_complete (which can flush its store) & the
+        response cache run on WORK_THREADS threads.
+        Use it as the Crawler's worker_factory (FETCH_MODE = async in config.ini).
+    '''
+    def __init__(self, worker_id, config, frontier):
+        assert aiohttp is not None, "FETCH_MODE = async needs aiohttp (pip install aiohttp)"
+        super().__init__(worker_id, config, frontier)
+
+    def run(self):
+        asyncio.run(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        free_tasks = Semaphore(self.config.async_tasks)
+        with ThreadPoolExecutor(WORK_THREADS) as executor:
+            connector = aiohttp.TCPConnector(limit=self.config.async_tasks)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                await asyncio.gather(
+                    loop.run_in_executor(None, self._feed, loop, queue, free_tasks),
+                    *(self._fetch_loop(session, executor, queue, free_tasks)
+                      for _ in range(self.config.async_tasks)))
+        self.logger.info("Frontier is empty. Stopping Crawler.")
+
+    def _feed(self, loop, queue, free_tasks):
+        ''' Hands urls from the frontier to the fetch tasks, on a thread of its own. A url
+            is only taken once a task is free for it, so none waits in the queue while
+            the frontier counts it as in progress.
+        '''
+        try:
+            while True:
+                free_tasks.acquire()
+                tbd_url = self.frontier.get_tbd_url()
+                if not tbd_url:
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, tbd_url)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None) # stops the tasks
+
+    def _accept(self, tbd_url, scraped_urls, delta):
+        ''' Second half of scrape, run on a work thread. Returns: (low value, stats) '''
+        scraped_urls, low_value, stats = self.accept(scraped_urls, delta)
+        self.frontier.add_urls(scraped_urls, parent=tbd_url)
+        return low_value, stats
+
+    async def _fetch_loop(self, session, executor, queue, free_tasks):
+        loop = asyncio.get_running_loop()
+        while True:
+            tbd_url = await queue.get()
+            if not tbd_url:
+                queue.put_nowait(None) # for the next task
+                break
+            low_value, fetched, stats = None, True, None
+            try:
+                with metrics.timer("download"):
+                    resp = await download_async(
+                        tbd_url, self.config, session, self.logger, executor)
+                fetched = not resp.from_cache
+                metrics.count(f"status_{resp.status}")
+                self.log_download(tbd_url, resp)
+                with metrics.timer("scrape"):
+                    if self.parse_pool is None:
+                        scraped_urls, delta = await loop.run_in_executor(
+                            executor, scraper.process_page, tbd_url, resp)
+                    else:
+                        scraped_urls, delta = await asyncio.wrap_future(
+                            submit_page(self.parse_pool, tbd_url, resp))
+                    low_value, stats = await loop.run_in_executor(
+                        executor, self._accept, tbd_url, scraped_urls, delta)
+            except Exception:
+                # the url still has to be marked complete, or the other workers wait on it forever
+                self.logger.exception(f"Failed to process {tbd_url}.")
+            await loop.run_in_executor(
+                executor, self.frontier.mark_url_complete, tbd_url, low_value, fetched, stats)
+            free_tasks.release()
@@ -0,0 +1,245 @@
+import os
+import copy
+import time
+import multiprocessing
+from queue import Empty
+from threading import Thread, Lock
+from zlib import crc32
+
+from utils import get_logger, configure_logging, stop_logging
+from crawler import Crawler
+from crawler.frontier import Frontier
+from crawler.scheduler import get_host
+from crawler.worker import Worker
+from crawler.async_worker import AsyncWorker
+import scraper
+
+FORWARD_BATCH_SIZE = 100 # foreign urls buffered per partition before a batch is sent
+FORWARD_INTERVAL = 1.0 # seconds, buffered urls are sent at least this often
+LIVENESS_INTERVAL = 1.0 # seconds, the coordinator checks the partitions are alive this often
+
+
+def partition_of(url, partitions):
+    ''' The partition that owns a url: a stable hash of its host, so every host (and its
+        politeness state) lives in exactly one partition.
+    '''
+    return crc32(get_host(url).encode("utf-8")) % partitions
+
+
+class PartitionedFrontier(Frontier):
+    ''' Frontier of one partition. urls of its own hosts are added as usual; urls of other
+        partitions' hosts are buffered & sent in batches to the coordinator, which forwards
+        them to their owner (whose frontier does the dedup). The crawl only ends when the
+        coordinator says every partition is idle & no batch is in flight.
+        Forwarded urls are also saved in the store (in the same flush as the completion of
+        the page they were found on) until the owner acknowledges the batch, once it has
+        saved them in its own store. On resume the unacknowledged batches are sent again,
+        so a crash never loses the links a completed page forwarded.
+    '''
+    def __init__(self, config, restart, index, partitions, inbox, outbox):
+        self.index = index
+        self.partitions = partitions
+        self.outbox = outbox # to the coordinator
+        self.forward = {i: list() for i in range(partitions) if i != index} # (url, depth)
+        self.batches = dict() # target -> id of the batch being buffered for it
+        self.next_batch = None # id of the next batch, after the saved ones
+        self.first_batch = None # id of the first batch of this run
+        self.forward_lock = Lock()
+        self.last_forward = time.monotonic()
+        self.received = 0 # batches received from the coordinator
+        self.reported = None # self.received when idle was last reported
+        self.stopped = False
+        super().__init__(config, restart)
+        self._resend_forwards()
+        Thread(target=self._receive, args=(inbox,), daemon=True).start()
+
+    def _resend_forwards(self):
+        ''' Sends the batches saved before a restart that were never acknowledged. '''
+        batches = dict()
+        with self.save_lock:
+            for batch, target, url, depth in self.save.forwards():
+                if self.first_batch is not None and batch >= self.first_batch:
+                    continue # sent by this run (seeds)
+                batches.setdefault((batch, target), list()).append((url, depth))
+        for (batch, target), urls in batches.items():
+            self.outbox.put(("batch", self.index, target, batch, urls))
+        if batches:
+            self.logger.info(
+                f"Sent {len(batches)} unacknowledged batches of forwarded urls again.")
+
+    def _add_urls(self, urls, depth):
+        local = list()
+        with self.forward_lock:
+            for url in urls:
+                target = partition_of(url, self.partitions)
+                if target == self.index:
+                    local.append(url)
+                    continue
+                if not self.forward[target]: # a new batch
+                    if self.next_batch is None:
+                        with self.save_lock:
+                            self.next_batch = max(
+                                [row[0] for row in self.save.forwards()], default=0) + 1
+                        self.first_batch = self.next_batch
+                    self.batches[target] = self.next_batch
+                    self.next_batch += 1
+                with self.save_lock:
+                    self.save.add_forward(self.batches[target], target, url, depth)
+                self.forward[target].append((url, depth))
+                if len(self.forward[target]) >= FORWARD_BATCH_SIZE:
+                    self._flush_forward()
+            if time.monotonic() - self.last_forward >= FORWARD_INTERVAL:
+                self._flush_forward()
+        if local:
+            super()._add_urls(local, depth)
+
+    def _flush_forward(self):
+        ''' Sends the buffered foreign urls (call w forward_lock held). '''
+        self.last_forward = time.monotonic()
+        for target, urls in self.forward.items():
+            if urls:
+                self.outbox.put(("batch", self.index, target, self.batches[target], urls))
+                self.forward[target] = list()
+
+    def _receive(self, inbox):
+        while True:
+            message = inbox.get()
+            if message[0] == "stop":
+                with self.has_work:
+                    self.stopped = True
+                    self.has_work.notify_all()
+                return
+            if message[0] == "ack": # the owner saved a batch we sent
+                with self.save_lock:
+                    self.save.ack_forwards(message[1])
+                continue
+            _, source, batch, urls = message
+            by_depth = dict()
+            for url, depth in urls:
+                by_depth.setdefault(depth, list()).append(url)
+            for depth, urls in by_depth.items():
+                super()._add_urls(urls, depth)
+            with self.save_lock:
+                self.save.flush() # saved before the sender forgets them
+            self.outbox.put(("ack", source, batch))
+            with self.has_work:
+                self.received += 1
+                self.has_work.notify_all()
+
+    def is_finished(self):
+        if self.stopped:
+            return True
+        if self.reported != self.received:
+            # locally idle: send what's buffered, then tell the coordinator (once per idle spell)
+            with self.forward_lock:
+                self._flush_forward()
+            self.outbox.put(("idle", self.index, self.received))
+            self.reported = self.received
+        return False
+
+
+def run_partition(config, restart, index, partitions, inbox, outbox):
+    ''' Entry point of one partition process: a whole Crawler w its own frontier, save
+        file, stats log & metrics file.
+    '''
+    configure_logging(config, suffix=f".part{index}") # a fresh process, logging isn't set up
+    config.save_file = f"{config.save_file}.part{index}"
+    config.metrics_file = f"{config.metrics_file}.part{index}"
+    if config.metrics_port:
+        config.metrics_port += index
+    scraper.STATS_LOG = f"{scraper.STATS_LOG}.part{index}" # stats resume from the save file
+    worker_factory = AsyncWorker if config.fetch_mode == "async" else Worker
+    crawler = Crawler(
+        config, restart, worker_factory=worker_factory,
+        frontier_factory=lambda config, restart: PartitionedFrontier(
+            config, restart, index, partitions, inbox, outbox))
+    crawler.start()
+    scraper.save_stats_log()
+    stop_logging()
+
+
+def _check_alive(processes, logger):
+    ''' Stops the crawl if a partition exited before it was told to: terminates the
+        others & raises RuntimeError.
+    '''
+    dead = [process for process in processes if not process.is_alive()]
+    if not dead:
+        return
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+    message = (
+        f"{', '.join(f'{process.name} (exit code {process.exitcode})' for process in dead)} "
+        f"died, stopped the other partitions. See Logs/*.part<i>.log.")
+    logger.error(message)
+    raise RuntimeError(message)
+
+
+def run_distributed(config, restart, partitions):
+    ''' Runs `partitions` crawler processes, one per host hash partition, w this process
+        as the coordinator: it forwards url batches (& their acknowledgements) between
+        partitions & stops them all once every partition is idle w no batch in flight.
+        Returns: the stats logs of the partitions (to be merged)
+        Raises: RuntimeError if a partition dies (the others are terminated) or fails
+    '''
+    logger = get_logger("COORDINATOR")
+    if restart:
+        # stale stats logs of a previous run (stats are resumed from the save files)
+        for index in range(partitions):
+            if os.path.exists(f"{scraper.STATS_LOG}.part{index}"):
+                os.remove(f"{scraper.STATS_LOG}.part{index}")
+    context = multiprocessing.get_context("spawn") # clean children, no forked threads/locks
+    outbox = context.Queue()
+    inboxes = [context.Queue() for _ in range(partitions)]
+    processes = [
+        context.Process(
+            target=run_partition,
+            args=(copy.copy(config), restart, index, partitions, inboxes[index], outbox),
+            name=f"Partition-{index}")
+        for index in range(partitions)]
+    for process in processes:
+        process.start()
+
+    forwarded = [0] * partitions # batches sent to each partition
+    idle = [False] * partitions
+    urls_forwarded = 0
+    last_check = time.monotonic()
+    while not all(idle):
+        try:
+            message = outbox.get(timeout=LIVENESS_INTERVAL)
+        except Empty:
+            message = None
+        if message is None or time.monotonic() - last_check >= LIVENESS_INTERVAL:
+            # a partition that died (OOM, an exception starting its Crawler, ...) would
+            # never report idle & the crawl would hang
+            _check_alive(processes, logger)
+            last_check = time.monotonic()
+        if message is None:
+            continue
+        if message[0] == "batch":
+            _, source, target, batch, urls = message
+            inboxes[target].put(("urls", source, batch, urls))
+            forwarded[target] += 1
+            idle[target] = False
+            urls_forwarded += len(urls)
+        elif message[0] == "ack":
+            _, source, batch = message
+            inboxes[source].put(("ack", batch))
+        else:
+            _, index, received = message
+            # stale if batches were forwarded to it after it went idle
+            idle[index] = received == forwarded[index]
+    logger.info(
+        f"All {partitions} partitions idle, stopping. "
+        f"Forwarded {urls_forwarded} urls in {sum(forwarded)} batches.")
+    for inbox in inboxes:
+        inbox.put(("stop",))
+    for process in processes:
+        process.join()
+    failed = [process for process in processes if process.exitcode != 0]
+    if failed:
+        raise RuntimeError(
+            f"{', '.join(process.name for process in failed)} failed after the crawl "
+            f"(exit codes {[process.exitcode for process in failed]}), see Logs/*.part<i>.log.")
+    return [f"{scraper.STATS_LOG}.part{index}" for index in range(partitions)]
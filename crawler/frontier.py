@@ -1,18 +1,64 @@
 import os
-import shelve
+import time
+from hashlib import sha256
+from inspect import getsource
 
-from threading import Thread, RLock
+from threading import Thread, RLock, Condition
 from queue import Queue, Empty
 
 from utils import get_logger, get_urlhash, normalize
-from scraper import is_valid
+from utils.metrics import metrics
+from scraper import is_valid, URL_FILTER, combine_deltas, restore_stats
+from crawler.scheduler import HostScheduler
+from crawler.priority import make_priority_policy
+from crawler.traps import TrapDetector
+from crawler.store import UrlStore
+from crawler.seen import make_seen_index, bytes_per_million
 
 class Frontier(object):
+    ''' Thread safe frontier. Two locks are used so workers waiting on the queue never
+        hold up the store and the other way around:
+            queue_lock - guards to_be_downloaded & in_progress (has_work waits on it)
+            save_lock - guards self.save (the store isn't safe to share between threads)
+        get_tbd_url blocks while other workers are still downloading, since they may add
+        more urls, and returns None only when the queue is empty & nothing is in progress.
+        to_be_downloaded is a HostScheduler, so politeness (config.time_delay) is enforced
+        per host here instead of by the workers sleeping after every download. Urls are
+        handed out by the priority the policy (config.priority, crawler/priority.py) gave
+        them when they were found; depth & priority are stored w the url, so the order
+        carries over a restart.
+        self.traps (config [TRAPS]) blocks or throttles urls of patterns & hosts that look
+        like traps, see crawler/traps.py. Blocked urls are saved as completed, so they're
+        only checked the first time they're found. Throttled urls are queued by (1, priority) &
+        all others by (0, priority), so they come after every other url whatever the
+        scale of the policy's priorities.
+        self.save is a write-behind UrlStore (SQLite), configured by [PERSISTENCE]. It is
+        fronted by self.seen, an in-memory index of seen urlhashes rebuilt from the store
+        at startup, so duplicate links are rejected w/o touching disk. The stats of a page
+        are saved in the store w its completion (see mark_url_complete) & restored into
+        scraper.stats on resume.
+        On resume only pending urls are read, and is_valid results are cached in the store
+        until the url rules (see rules_version) change.
+    '''
     def __init__(self, config, restart):
         self.logger = get_logger("FRONTIER")
         self.config = config
-        self.to_be_downloaded = list()
-        
+        self.to_be_downloaded = HostScheduler(config.time_delay)
+        self.policy = make_priority_policy(config.priority)
+        self.in_progress = 0
+        self.depths = dict() # url -> depth, for the urls in progress
+        self.traps = None
+        if config.trap_detection:
+            self.traps = TrapDetector(
+                config.max_path_depth, config.max_repeated_segments, config.max_param_values,
+                config.trap_min_samples, config.trap_throttle_rate, config.trap_block_rate)
+            metrics.gauge("trap_decisions", self.traps.report)
+        self.queue_lock = RLock()
+        self.has_work = Condition(self.queue_lock)
+        self.save_lock = RLock()
+        metrics.gauge("queue_depth_per_host", self.queue_depths)
+        metrics.gauge("in_progress", lambda: self.in_progress)
+
         if not os.path.exists(self.config.save_file) and not restart:
             # Save file does not exist, but request to load save.
             self.logger.info(
@@ -22,51 +68,180 @@ class Frontier(object):
             # Save file does exists, but request to start from seed.
             self.logger.info(
                 f"Found save file {self.config.save_file}, deleting it.")
-            os.remove(self.config.save_file)
+            UrlStore.remove(self.config.save_file)
         # Load existing save file, or create one if it does not exist.
-        self.save = shelve.open(self.config.save_file)
+        self.save = UrlStore(
+            self.config.save_file, self.config.durability,
+            self.config.flush_size, self.config.flush_interval, combine_deltas)
+        self.seen = make_seen_index(
+            self.config.seen_index, self.config.bloom_capacity, self.config.bloom_fp_rate)
+        if not restart:
+            self._load_seen_index()
         if restart:
             for url in self.config.seed_urls:
                 self.add_url(url)
         else:
             # Set the frontier state with contents of save file.
             self._parse_save_file()
-            if not self.save:
+            self._load_stats()
+            if not len(self.seen):
                 for url in self.config.seed_urls:
                     self.add_url(url)
 
+    def _load_seen_index(self):
+        for urlhash in self.save.hashes():
+            self.seen.add(urlhash)
+        self.logger.info(
+            f"Seen index ({self.config.seen_index}) holds {len(self.seen)} urls in "
+            f"{self.seen.nbytes() / 2**20:.1f} MB, "
+            f"{bytes_per_million(self.seen) / 2**20:.1f} MB per million urls.")
+
+    @staticmethod
+    def rules_version():
+        ''' Identifies the url rules: the compiled rule lists & the source of is_valid. '''
+        return sha256(
+            (URL_FILTER.version + getsource(is_valid)).encode("utf-8")).hexdigest()[:16]
+
     def _parse_save_file(self):
         ''' This function can be overridden for alternate saving techniques. '''
-        total_count = len(self.save)
+        total_count = len(self.seen)
         tbd_count = 0
-        for url, completed in self.save.values():
-            if not completed and is_valid(url):
-                self.to_be_downloaded.append(url)
+        rules = self.rules_version()
+        checked = list() # (urlhash, valid) of urls not yet checked against these rules
+        for urlhash, url, url_rules, valid, depth, priority, throttled in self.save.pending():
+            if url_rules != rules:
+                valid = is_valid(url)
+                checked.append((urlhash, valid))
+            if valid:
+                depth = depth or 0
+                if priority is None: # stored before priorities were kept
+                    priority = self.policy.priority(url, depth, 0.0)
+                else:
+                    self.policy.restore(url)
+                self.to_be_downloaded.push(url, (throttled or 0, priority), depth)
                 tbd_count += 1
+        self.save.set_validity(checked, rules)
         self.logger.info(
             f"Found {tbd_count} urls to be downloaded from {total_count} "
-            f"total urls discovered.")
+            f"total urls discovered ({len(checked)} checked against url rules {rules}).")
+
+    def _load_stats(self):
+        ''' Restores the stats of the pages completed before the restart. '''
+        records = 0
+        with self.save_lock:
+            for record in self.save.stats_records():
+                restore_stats(record)
+                records += 1
+        self.logger.info(f"Restored stats from {records} records in the save file.")
 
     def get_tbd_url(self):
-        try:
-            return self.to_be_downloaded.pop()
-        except IndexError:
-            return None
+        ''' Blocks until a url whose host is ready is available. Returns None once the
+            crawl is finished.
+        '''
+        with self.has_work:
+            while True:
+                now = time.monotonic()
+                url, depth, wait = self.to_be_downloaded.pop(now)
+                if url and self.traps and self.traps.blocked(url):
+                    # its pattern or host was blocked after it was queued: drop it
+                    self.to_be_downloaded.release(url, now, fetched=False)
+                    with self.save_lock:
+                        self.save[get_urlhash(url)] = (url, True, None, None, None)
+                    metrics.count("traps_dropped")
+                    continue
+                if url:
+                    self.in_progress += 1
+                    self.depths[url] = depth
+                    return url
+                if wait is None and not self.in_progress and self.is_finished():
+                    self.has_work.notify_all() # wake the other waiting workers so they stop too
+                    return None
+                # wait for the next host to be ready, or for a url to be added/completed
+                self.has_work.wait(wait)
+
+    def is_finished(self):
+        ''' Called under the queue lock once nothing is queued or in progress. A frontier
+            that can still get urls from elsewhere (see crawler/distributed.py) returns
+            False & notifies has_work when they arrive.
+        '''
+        return True
+
+    def queue_depths(self):
+        ''' {host: urls waiting} for the metrics snapshot. '''
+        with self.queue_lock:
+            return {host: len(urls) for host, urls in self.to_be_downloaded.queues.items()}
 
     def add_url(self, url):
-        url = normalize(url)
-        urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            self.save[urlhash] = (url, False)
-            self.save.sync()
-            self.to_be_downloaded.append(url)
-    
-    def mark_url_complete(self, url):
+        self.add_urls([url])
+
+    def add_urls(self, urls, parent=None):
+        ''' Adds the links found on parent (an url in progress), or seeds if it's None. '''
+        with metrics.timer("frontier_add"):
+            with self.queue_lock:
+                depth = self.depths[parent] + 1 if parent in self.depths else 0
+            self._add_urls(urls, depth)
+
+    def _add_urls(self, urls, depth):
+        new = list()
+        with self.save_lock:
+            for url in urls:
+                url = normalize(url)
+                urlhash = get_urlhash(url)
+                # a miss in the index means new for sure, only inexact hits are checked on disk
+                if urlhash in self.seen and (self.seen.exact or urlhash in self.save):
+                    continue
+                decision = self.traps.check(url) if self.traps else None
+                self.seen.add(urlhash)
+                if decision == "block":
+                    # saved as done (like queued urls dropped in get_tbd_url), so finding
+                    # it again doesn't check & log it again, after a restart too
+                    self.save[urlhash] = (url, True, depth, None, None)
+                    continue
+                new.append((urlhash, url, decision == "throttle"))
+            value = len(new) / len(urls) if urls else 0.0 # share of the links that are new
+            added = list()
+            for urlhash, url, throttled in new:
+                priority = self.policy.priority(url, depth, value)
+                self.save[urlhash] = (url, False, depth, priority, int(throttled))
+                added.append((url, (int(throttled), priority)))
+        if not added:
+            return
+        with self.has_work:
+            for url, priority in added:
+                self.to_be_downloaded.push(url, priority, depth)
+            self.has_work.notify(len(added))
+
+    def mark_url_complete(self, url, low_value=None, fetched=True, stats=None):
+        ''' low_value - whether the page was an error, too short or a duplicate (None if
+                it couldn't be processed), counted by the trap detector
+            fetched - False if the page came from the response cache, the host's politeness
+                delay only starts after real downloads
+            stats - the stats delta merged into scraper.stats for the page (None if there's
+                none), saved in the same store transaction as the url's completion: after
+                a crash, a page is either complete & counted or fetched again, never only
+                one of them
+        '''
+        if self.traps and low_value is not None:
+            self.traps.record_fetch(url, low_value)
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            # This should not happen.
-            self.logger.error(
-                f"Completed url {url}, but have not seen it before.")
+        with self.save_lock:
+            if urlhash not in self.seen:
+                # This should not happen.
+                self.logger.error(
+                    f"Completed url {url}, but have not seen it before.")
+
+            if stats:
+                self.save.add_stats(stats)
+            self.save[urlhash] = (url, True, None, None, None)
+        metrics.count("pages")
+        with self.has_work:
+            self.in_progress = max(self.in_progress - 1, 0)
+            self.depths.pop(url, None)
+            self.to_be_downloaded.release(url, time.monotonic(), fetched)
+            # the host's next url may now be the one ready soonest, or the crawl is finished
+            self.has_work.notify_all()
 
-        self.save[urlhash] = (url, True)
-        self.save.sync()
+    def close(self):
+        ''' Flushes pending writes & closes the store. '''
+        with self.save_lock:
+            self.save.close()
@@ -0,0 +1,37 @@
+import multiprocessing
+from threading import Lock
+from concurrent.futures import ProcessPoolExecutor
+
+import scraper
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_parse_pool(processes):
+    ''' The process pool shared by all workers (created on first use).
+        Its processes are spawned, not forked: the pool starts on the first submit,
+        while worker threads & the log listener run, and a forked child could inherit
+        a lock one of them held (e.g. metrics.lock) & deadlock on it.
+    '''
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def submit_page(pool, url, resp):
+    ''' Runs scraper.process_page in a parse process. The future's result is
+        (links, stats delta); the caller passes both to scraper.accept_page, so
+        the processes never share the global stats or the duplicate index.
+    '''
+    return pool.submit(scraper.process_page, url, resp.stripped())
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,69 @@
+from collections import Counter
+from urllib.parse import urlparse
+
+from crawler.scheduler import get_host
+
+
+class PriorityPolicy(object):
+    ''' Orders the frontier: priority(url, depth, value) is computed once, when a url is
+        discovered, and the lowest priority is fetched first. Ties go to the url
+        discovered first.
+            depth - links followed from a seed (seeds are 0)
+            value - share (0-1) of the links on the page the url came from that were new,
+                a cheap measure of how much unexplored content that page leads to
+        Not thread safe on its own, the Frontier calls it under its save lock.
+    '''
+    def __init__(self):
+        self.hosts = Counter() # host -> urls discovered
+
+    def restore(self, url):
+        ''' Counts a pending url read back from the store on resume. '''
+        self.hosts[get_host(url)] += 1
+
+    def priority(self, url, depth, value):
+        self.hosts[get_host(url)] += 1
+        return self._priority(url, depth, value)
+
+    def _priority(self, url, depth, value):
+        raise NotImplementedError
+
+
+class DepthPolicy(PriorityPolicy):
+    ''' Breadth first: shallow pages first. '''
+    def _priority(self, url, depth, value):
+        return depth
+
+
+class FairnessPolicy(PriorityPolicy):
+    ''' Round robin over hosts: the n-th url found on a host waits for the n-th url of
+        every other host, so no single large host takes over the crawl.
+    '''
+    def _priority(self, url, depth, value):
+        return self.hosts[get_host(url)] - 1
+
+
+class ScorePolicy(PriorityPolicy):
+    ''' Highest score first. The score rewards urls from pages w mostly new links & urls
+        on hosts not seen before, and penalizes depth, long paths & query strings, which
+        is where the traps is_valid misses tend to be.
+    '''
+    def _priority(self, url, depth, value):
+        parsed = urlparse(url)
+        score = value
+        if self.hosts[get_host(url)] == 1: # first url of this host
+            score += 1.0
+        score -= 0.25 * depth
+        score -= 0.1 * len([segment for segment in parsed.path.split("/") if segment])
+        if parsed.query:
+            score -= 0.5
+        return -score
+
+
+POLICIES = {"depth": DepthPolicy, "fairness": FairnessPolicy, "score": ScorePolicy}
+
+
+def make_priority_policy(kind):
+    ''' Builds the frontier's policy for the PRIORITY setting: depth, fairness or score. '''
+    if kind not in POLICIES:
+        raise ValueError(f"Unknown priority policy {kind!r}")
+    return POLICIES[kind]()
@@ -0,0 +1,94 @@
+import heapq
+from urllib.parse import urlparse
+
+
+def get_host(url):
+    ''' Key used for politeness: the lowercased host (w/o port). '''
+    return urlparse(url).hostname or ""
+
+
+class HostScheduler(object):
+    ''' Per-host politeness scheduler. Every host has its own queue of urls and a
+        time before which it may not be fetched again. Idle hosts with queued urls
+        are kept in a heap keyed by that ready time; once ready they move to a second
+        heap keyed by the priority of their best url, so the url handed out is the one
+        w the lowest priority among the hosts that may be fetched now (see
+        crawler/priority.py). Within a host, urls are handed out by priority too, ties
+        in the order they were pushed. A priority can be anything comparable, e.g. the
+        Frontier's (throttled, priority) tuples.
+
+        A host is busy from the moment one of its urls is handed out until
+        release() is called for it, and becomes ready again `delay` seconds later.
+        So a host never has more than one download in flight and consecutive
+        downloads from it are at least `delay` apart, while different hosts are
+        fetched in parallel.
+
+        Not thread safe on its own, the Frontier calls it under its queue lock.
+    '''
+    def __init__(self, delay):
+        self.delay = delay
+        self.queues = dict() # host -> heap of (priority, sequence, url, depth)
+        self.ready_at = dict() # host -> earliest time of the next fetch
+        self.heap = list() # (ready_at, host) for every idle, waiting host that has queued urls
+        self.ready = list() # (priority, sequence, host) for ready hosts, lazily updated
+        self.ready_hosts = set() # hosts that have entries in self.ready
+        self.busy = set() # hosts w a download in flight
+        self.sequence = 0
+        self.pending = 0
+
+    def __len__(self):
+        return self.pending
+
+    def push(self, url, priority=0, depth=0):
+        host = get_host(url)
+        queue = self.queues.get(host)
+        if queue is None:
+            queue = self.queues[host] = list()
+        entry = (priority, self.sequence, url, depth)
+        self.sequence += 1
+        heapq.heappush(queue, entry)
+        self.pending += 1
+        if host in self.ready_hosts:
+            if queue[0] is entry: # the host's best url changed, re-rank it
+                heapq.heappush(self.ready, (priority, entry[1], host))
+        elif len(queue) == 1 and host not in self.busy:
+            heapq.heappush(self.heap, (self.ready_at.get(host, 0.0), host))
+
+    def pop(self, now):
+        ''' Returns (url, depth, 0) for the best url of the hosts that are ready, (None,
+            None, seconds until the next host is ready) if no host is ready yet or (None,
+            None, None) if there is nothing left that isn't busy.
+        '''
+        while self.heap and self.heap[0][0] <= now:
+            _, host = heapq.heappop(self.heap)
+            priority, sequence = self.queues[host][0][:2]
+            heapq.heappush(self.ready, (priority, sequence, host))
+            self.ready_hosts.add(host)
+        while self.ready:
+            priority, sequence, host = heapq.heappop(self.ready)
+            if host not in self.ready_hosts or self.queues[host][0][:2] != (priority, sequence):
+                continue # stale entry
+            self.ready_hosts.discard(host)
+            queue = self.queues[host]
+            _, _, url, depth = heapq.heappop(queue)
+            if not queue:
+                del self.queues[host]
+            self.pending -= 1
+            self.busy.add(host)
+            return url, depth, 0
+        if not self.heap:
+            return None, None, None
+        return None, None, self.heap[0][0] - now
+
+    def release(self, url, now, fetched=True):
+        ''' Called once the download of url is done, starts the host's politeness delay
+            (unless url was dropped w/o being fetched).
+        '''
+        host = get_host(url)
+        if host not in self.busy:
+            return
+        self.busy.discard(host)
+        if fetched:
+            self.ready_at[host] = now + self.delay
+        if host in self.queues:
+            heapq.heappush(self.heap, (self.ready_at.get(host, 0.0), host))
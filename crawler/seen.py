@@ -0,0 +1,88 @@
+import sys
+import math
+
+
+DIGEST_SIZE = 16 # bytes of the sha256 urlhash kept in memory (128 bits)
+
+
+class DigestSet(object):
+    ''' Exact seen-url index: a set of fixed-size binary digests of the urlhash
+        (16 bytes instead of the 64 char hex string), so membership never needs
+        the store.
+    '''
+    exact = True
+
+    def __init__(self):
+        self.digests = set()
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, urlhash):
+        return bytes.fromhex(urlhash[:DIGEST_SIZE * 2]) in self.digests
+
+    def add(self, urlhash):
+        self.digests.add(bytes.fromhex(urlhash[:DIGEST_SIZE * 2]))
+
+    def nbytes(self):
+        ''' Approximate memory used, in bytes. '''
+        if not self.digests:
+            return sys.getsizeof(self.digests)
+        return sys.getsizeof(self.digests) + len(self.digests) * sys.getsizeof(bytes(DIGEST_SIZE))
+
+
+class BloomFilter(object):
+    ''' Approximate seen-url index with a fixed memory budget, sized for `capacity`
+        urls at a false positive rate of `fp_rate`. A miss means the url is new for
+        sure; a hit may be a false positive and has to be confirmed by the store
+        (exact is False). Past capacity the false positive rate grows, but answers
+        stay correct since hits are always confirmed.
+    '''
+    exact = False
+
+    def __init__(self, capacity=1_000_000, fp_rate=0.001):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.size = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2))) # bits
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, urlhash):
+        # double hashing w two 64 bit halves of the (already uniform) sha256 urlhash
+        first, second = int(urlhash[:16], 16), int(urlhash[16:32], 16) | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def __contains__(self, urlhash):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(urlhash))
+
+    def add(self, urlhash):
+        for pos in self._positions(urlhash):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def nbytes(self):
+        ''' Approximate memory used, in bytes. '''
+        return sys.getsizeof(self.bits)
+
+
+def make_seen_index(kind, capacity=1_000_000, fp_rate=0.001):
+    ''' Builds the seen-url index set by SEEN_INDEX in config.ini ("digest" or "bloom"). '''
+    if kind == "bloom":
+        return BloomFilter(capacity, fp_rate)
+    if kind == "digest":
+        return DigestSet()
+    raise ValueError(f"Unknown seen index {kind!r}")
+
+
+def bytes_per_million(index):
+    ''' Memory the index uses per million urls, extrapolated from its current size. '''
+    if isinstance(index, BloomFilter):
+        return index.nbytes() * 1_000_000 / index.capacity
+    if not len(index):
+        return sys.getsizeof(bytes(DIGEST_SIZE)) * 1_000_000
+    return index.nbytes() * 1_000_000 / len(index)
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+
+from utils.metrics import metrics
+
+
+# PRAGMA synchronous for each DURABILITY setting in config.ini
+SYNC_MODES = {"off": "OFF", "normal": "NORMAL", "full": "FULL"}
+
+
+class UrlStore(object):
+    ''' Write-behind url store on top of SQLite in WAL mode.
+
+        Writes go to an in-memory batch (urlhash -> (url, completed, depth, priority,
+        throttled)) and
+        are flushed in a single transaction with one bulk insert once the batch holds
+        flush_size urls or flush_interval seconds passed since the last flush. SQLite's
+        write-ahead log makes every flush atomic and is replayed automatically when the
+        file is opened again, so a crash only loses the writes of the current batch,
+        never half of one. depth, priority & throttled are kept so the frontier's order
+        survives a restart.
+        The stats deltas of the urls completed in a batch (see add_stats) are combined by
+        combine_stats into one record & written in the same transaction, so a page's
+        stats are saved exactly when its completion is. The same goes for the urls a page
+        forwarded to other partitions (see add_forward), which are kept until their owner
+        acknowledges them.
+
+        Not thread safe on its own, the Frontier calls it under its save lock.
+    '''
+    def __init__(self, path, durability="normal", flush_size=500, flush_interval=5.0,
+                 combine_stats=None):
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.combine_stats = combine_stats # list of deltas -> one JSON serializable record
+        self.batch = dict()
+        self.stats_batch = list() # stats deltas of the urls completed in this batch
+        self.forward_batch = list() # (batch, target, url, depth) forwarded in this batch
+        self.last_flush = time.monotonic()
+
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"PRAGMA synchronous={SYNC_MODES[durability.lower()]}")
+        # rules & valid cache is_valid(url) for pending urls: valid holds for the url rules
+        # whose version is in rules (NULL until the url is first checked on a resume)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "urlhash TEXT PRIMARY KEY, url TEXT NOT NULL, completed INTEGER NOT NULL, "
+            "rules TEXT, valid INTEGER, depth INTEGER, priority REAL, throttled INTEGER)")
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(urls)")}
+        for column, kind in (
+                ("rules", "TEXT"), ("valid", "INTEGER"), ("depth", "INTEGER"), ("priority", "REAL"),
+                ("throttled", "INTEGER")):
+            if column not in columns: # store written before validity/priorities were kept
+                self.db.execute(f"ALTER TABLE urls ADD COLUMN {column} {kind}")
+        # partial index of pending urls, so a resume only reads those
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS pending_urls ON urls (urlhash) WHERE completed = 0")
+        # stats records (zlib compressed JSON), one per flush that completed pages
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY, record BLOB NOT NULL)")
+        # urls forwarded to other partitions that their owner hasn't acknowledged yet
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS forwards ("
+            "batch INTEGER NOT NULL, target INTEGER NOT NULL, url TEXT NOT NULL, depth INTEGER)")
+
+    @staticmethod
+    def remove(path):
+        ''' Deletes a store and its WAL files. '''
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def __contains__(self, urlhash):
+        if urlhash in self.batch:
+            return True
+        return self.db.execute(
+            "SELECT 1 FROM urls WHERE urlhash = ?", (urlhash,)).fetchone() is not None
+
+    def __len__(self):
+        self.flush()
+        return self.db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def __setitem__(self, urlhash, value):
+        ''' value - (url, completed, depth, priority, throttled), the last three may be None
+            to keep the stored ones (e.g. when a url is completed)
+        '''
+        previous = self.batch.get(urlhash)
+        if previous is not None and value[2] is None:
+            value = value[:2] + previous[2:]
+        self.batch[urlhash] = value
+        if (len(self.batch) >= self.flush_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def add_stats(self, delta):
+        ''' Adds a page's stats delta to the batch. Call it right before marking the
+            page's url complete, under the same lock, so both go in the same flush.
+        '''
+        assert self.combine_stats is not None, "UrlStore needs combine_stats to save stats"
+        self.stats_batch.append(delta)
+
+    def add_forward(self, batch, target, url, depth):
+        ''' Adds a url forwarded to partition target (in forward batch batch) to the batch.
+            Call it before marking the page it was found on complete, so it's saved in
+            the same or an earlier flush.
+        '''
+        self.forward_batch.append((batch, target, url, depth))
+
+    def ack_forwards(self, batch):
+        ''' Forgets the urls of a forward batch once its owner has saved them. '''
+        self.forward_batch = [row for row in self.forward_batch if row[0] != batch]
+        self.db.execute("DELETE FROM forwards WHERE batch = ?", (batch,))
+
+    def forwards(self):
+        ''' (batch, target, url, depth) of every forwarded url not acknowledged yet, in
+            the order they were forwarded.
+        '''
+        self.flush()
+        return self.db.execute(
+            "SELECT batch, target, url, depth FROM forwards ORDER BY rowid").fetchall()
+
+    def stats_records(self):
+        ''' Every saved stats record, in the order they were saved. '''
+        self.flush()
+        for (record,) in self.db.execute("SELECT record FROM stats ORDER BY id"):
+            yield json.loads(zlib.decompress(record))
+
+    def hashes(self):
+        ''' urlhash of every stored url. '''
+        self.flush()
+        for (urlhash,) in self.db.execute("SELECT urlhash FROM urls"):
+            yield urlhash
+
+    def pending(self):
+        ''' (urlhash, url, rules, valid, depth, priority, throttled) for every url that
+            isn't completed (the last three are None in stores written before they were kept).
+        '''
+        self.flush()
+        return self.db.execute(
+            "SELECT urlhash, url, rules, valid, depth, priority, throttled FROM urls "
+            "WHERE completed = 0 ORDER BY rowid").fetchall() # in the order they were found
+
+    def set_validity(self, checked, rules):
+        ''' Caches is_valid results for the given rules version.
+            checked - list of (urlhash, valid)
+        '''
+        if not checked:
+            return
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "UPDATE urls SET rules = ?, valid = ? WHERE urlhash = ?",
+                [(rules, int(valid), urlhash) for urlhash, valid in checked])
+
+    def values(self):
+        ''' (url, completed) for every stored url. '''
+        self.flush()
+        for url, completed in self.db.execute("SELECT url, completed FROM urls"):
+            yield url, bool(completed)
+
+    def flush(self):
+        ''' Writes the current batch in one transaction. '''
+        self.last_flush = time.monotonic()
+        if not self.batch and not self.stats_batch and not self.forward_batch:
+            return
+        rows = [
+            (urlhash, url, int(completed), depth, priority, throttled)
+            for urlhash, (url, completed, depth, priority, throttled) in self.batch.items()]
+        record = self.combine_stats(self.stats_batch) if self.stats_batch else None
+        metrics.count("persisted_urls", len(rows))
+        with metrics.timer("persistence"), self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "INSERT INTO urls (urlhash, url, completed, depth, priority, throttled) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(urlhash) DO UPDATE SET url = excluded.url, completed = excluded.completed, "
+                "depth = COALESCE(excluded.depth, depth), priority = COALESCE(excluded.priority, priority), "
+                "throttled = COALESCE(excluded.throttled, throttled)",
+                rows)
+            if record:
+                self.db.execute(
+                    "INSERT INTO stats (record) VALUES (?)",
+                    (zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8")),))
+            self.db.executemany(
+                "INSERT INTO forwards (batch, target, url, depth) VALUES (?, ?, ?, ?)",
+                self.forward_batch)
+        self.batch.clear()
+        self.stats_batch.clear()
+        self.forward_batch.clear()
+
+    def close(self):
+        self.flush()
+        self.db.close()
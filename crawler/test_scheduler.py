@@ -0,0 +1,85 @@
+from crawler.scheduler import HostScheduler, get_host
+
+
+def test_get_host_ignores_case_and_port():
+    assert get_host("https://WWW.ics.uci.edu:8080/a") == "www.ics.uci.edu"
+
+
+def test_host_waits_for_release_and_delay():
+    scheduler = HostScheduler(delay=0.5)
+    scheduler.push("https://a.ics.uci.edu/1")
+    scheduler.push("https://a.ics.uci.edu/2")
+    assert scheduler.pop(now=0.0) == ("https://a.ics.uci.edu/1", 0, 0)
+    # busy until released: nothing else of the host is handed out
+    assert scheduler.pop(now=10.0) == (None, None, None)
+    scheduler.release("https://a.ics.uci.edu/1", now=10.0)
+    url, depth, wait = scheduler.pop(now=10.2)
+    assert url is None and abs(wait - 0.3) < 1e-9
+    assert scheduler.pop(now=10.5) == ("https://a.ics.uci.edu/2", 0, 0)
+    assert len(scheduler) == 0
+
+
+def test_hosts_are_fetched_in_parallel():
+    scheduler = HostScheduler(delay=5.0)
+    scheduler.push("https://a.ics.uci.edu/1")
+    scheduler.push("https://b.ics.uci.edu/1")
+    assert scheduler.pop(now=0.0)[0] == "https://a.ics.uci.edu/1"
+    assert scheduler.pop(now=0.0)[0] == "https://b.ics.uci.edu/1"
+
+
+def test_dropped_url_starts_no_delay():
+    scheduler = HostScheduler(delay=5.0)
+    scheduler.push("https://a.ics.uci.edu/1")
+    scheduler.push("https://a.ics.uci.edu/2")
+    scheduler.pop(now=0.0)
+    scheduler.release("https://a.ics.uci.edu/1", now=1.0, fetched=False)
+    assert scheduler.pop(now=1.0)[0] == "https://a.ics.uci.edu/2"
+
+
+def test_release_of_an_idle_host_is_ignored():
+    scheduler = HostScheduler(delay=5.0)
+    scheduler.push("https://a.ics.uci.edu/1")
+    scheduler.release("https://a.ics.uci.edu/0", now=0.0)
+    assert scheduler.pop(now=0.0)[0] == "https://a.ics.uci.edu/1"
+
+
+def test_lowest_priority_first_ties_in_push_order():
+    scheduler = HostScheduler(delay=0.0)
+    for path, priority in (("1", 2), ("2", 1), ("3", 2), ("4", 0)):
+        scheduler.push(f"https://a.ics.uci.edu/{path}", priority, depth=priority)
+    order = list()
+    for now in range(4):
+        url, depth, _ = scheduler.pop(now=float(now))
+        order.append((url.rsplit("/", 1)[1], depth))
+        scheduler.release(url, now=float(now))
+    assert order == [("4", 0), ("2", 1), ("1", 2), ("3", 2)]
+
+
+def test_best_url_across_ready_hosts():
+    scheduler = HostScheduler(delay=0.0)
+    scheduler.push("https://a.ics.uci.edu/1", 3)
+    scheduler.push("https://b.ics.uci.edu/1", 1)
+    scheduler.push("https://c.ics.uci.edu/1", 2)
+    urls = [scheduler.pop(now=0.0)[0] for _ in range(3)]
+    assert urls == [
+        "https://b.ics.uci.edu/1", "https://c.ics.uci.edu/1", "https://a.ics.uci.edu/1"]
+
+
+def test_push_reranks_a_ready_host():
+    scheduler = HostScheduler(delay=0.0)
+    scheduler.push("https://a.ics.uci.edu/1", 5)
+    scheduler.push("https://b.ics.uci.edu/1", 3)
+    scheduler.pop(now=0.0) # b is busy now, a is ready
+    scheduler.push("https://a.ics.uci.edu/2", 1)
+    assert scheduler.pop(now=0.0)[0] == "https://a.ics.uci.edu/2"
+
+
+def test_tuple_priorities_put_throttled_urls_last():
+    # the Frontier queues (throttled, priority): a throttled url waits for every other
+    scheduler = HostScheduler(delay=0.0)
+    scheduler.push("https://a.ics.uci.edu/slow", (1, 0))
+    scheduler.push("https://a.ics.uci.edu/late", (0, 5000))
+    first, _, _ = scheduler.pop(now=0.0)
+    scheduler.release(first, now=0.0)
+    assert first == "https://a.ics.uci.edu/late"
+    assert scheduler.pop(now=0.0)[0] == "https://a.ics.uci.edu/slow"
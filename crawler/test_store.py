@@ -0,0 +1,143 @@
+import sqlite3
+
+import scraper
+from crawler.store import UrlStore
+
+
+def open_store(tmp_path, **kwargs):
+    kwargs.setdefault("flush_interval", 3600.0)
+    return UrlStore(str(tmp_path / "frontier.db"), combine_stats=scraper.combine_deltas, **kwargs)
+
+
+def stored_rows(tmp_path):
+    ''' What another connection (e.g. the next run after a crash) sees. '''
+    with sqlite3.connect(str(tmp_path / "frontier.db")) as db:
+        return db.execute("SELECT urlhash, completed FROM urls ORDER BY rowid").fetchall()
+
+
+def test_writes_are_batched(tmp_path):
+    store = open_store(tmp_path, flush_size=3)
+    store["h1"] = ("https://a.ics.uci.edu/1", False, 0, 0.0, 0)
+    store["h2"] = ("https://a.ics.uci.edu/2", False, 0, 0.0, 0)
+    assert "h1" in store # seen from the batch
+    assert stored_rows(tmp_path) == []
+    store["h3"] = ("https://a.ics.uci.edu/3", False, 0, 0.0, 0)
+    assert stored_rows(tmp_path) == [("h1", 0), ("h2", 0), ("h3", 0)]
+    store.close()
+
+
+def test_interval_flushes_a_partial_batch(tmp_path):
+    store = open_store(tmp_path, flush_size=100, flush_interval=0.0)
+    store["h1"] = ("https://a.ics.uci.edu/1", False, 0, 0.0, 0)
+    assert stored_rows(tmp_path) == [("h1", 0)]
+    store.close()
+
+
+def test_crash_loses_only_the_current_batch(tmp_path):
+    store = open_store(tmp_path, flush_size=2)
+    store["h1"] = ("https://a.ics.uci.edu/1", False, 0, 0.0, 0)
+    store["h2"] = ("https://a.ics.uci.edu/2", False, 0, 0.0, 0)
+    store["h3"] = ("https://a.ics.uci.edu/3", False, 0, 0.0, 0)
+    # no close(): the next run only finds the flushed batch
+    reopened = open_store(tmp_path)
+    assert sorted(reopened.hashes()) == ["h1", "h2"]
+    reopened.close()
+
+
+def test_completion_keeps_depth_priority_and_throttled(tmp_path):
+    store = open_store(tmp_path)
+    store["h1"] = ("https://a.ics.uci.edu/1", False, 2, 7.5, 1)
+    store["h2"] = ("https://a.ics.uci.edu/2", False, 3, 1.0, 0)
+    store["h1"] = ("https://a.ics.uci.edu/1", True, None, None, None) # merged in the batch
+    store.flush()
+    store["h2"] = ("https://a.ics.uci.edu/2", True, None, None, None) # merged in SQLite
+    store.close()
+    with sqlite3.connect(str(tmp_path / "frontier.db")) as db:
+        rows = db.execute(
+            "SELECT urlhash, completed, depth, priority, throttled FROM urls ORDER BY urlhash").fetchall()
+    assert rows == [("h1", 1, 2, 7.5, 1), ("h2", 1, 3, 1.0, 0)]
+
+
+def test_pending_in_discovery_order(tmp_path):
+    store = open_store(tmp_path)
+    for i in (3, 1, 2):
+        store[f"h{i}"] = (f"https://a.ics.uci.edu/{i}", False, i, float(i), 0)
+    store["h1"] = ("https://a.ics.uci.edu/1", True, None, None, None)
+    assert [(row[0], row[4]) for row in store.pending()] == [("h3", 3), ("h2", 2)]
+    store.close()
+
+
+def test_validity_cache(tmp_path):
+    store = open_store(tmp_path)
+    store["h1"] = ("https://a.ics.uci.edu/1", False, 0, 0.0, 0)
+    store.flush()
+    store.set_validity([("h1", False)], "rules-1")
+    assert store.pending()[0][2:4] == ("rules-1", 0)
+    store.close()
+
+
+def test_old_store_is_migrated(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    with sqlite3.connect(path) as db: # schema from before validity & priorities were kept
+        db.execute(
+            "CREATE TABLE urls (urlhash TEXT PRIMARY KEY, url TEXT NOT NULL, completed INTEGER NOT NULL)")
+        db.execute("INSERT INTO urls VALUES ('h1', 'https://a.ics.uci.edu/1', 0)")
+        db.execute("INSERT INTO urls VALUES ('h2', 'https://a.ics.uci.edu/2', 1)")
+    store = open_store(tmp_path)
+    assert store.pending() == [("h1", "https://a.ics.uci.edu/1", None, None, None, None, None)]
+    assert sorted(store.values()) == [
+        ("https://a.ics.uci.edu/1", False), ("https://a.ics.uci.edu/2", True)]
+    assert list(store.stats_records()) == []
+    store["h1"] = ("https://a.ics.uci.edu/1", False, 1, 2.0, 0)
+    store.close()
+    reopened = open_store(tmp_path)
+    assert reopened.pending()[0][4:] == (1, 2.0, 0)
+    reopened.close()
+
+
+def test_stats_are_saved_with_the_completion(tmp_path):
+    store = open_store(tmp_path, flush_size=2)
+    store.add_stats({
+        "unique_pgs": ["https://a.ics.uci.edu/1"], "longest_page": ("https://a.ics.uci.edu/1", 60),
+        "word_counts": {"crawler": 2}, "fingerprint": ("c1", 1)})
+    store["h1"] = ("https://a.ics.uci.edu/1", True, None, None, None)
+    store.add_stats({
+        "unique_pgs": ["https://a.ics.uci.edu/2"], "longest_page": ("https://a.ics.uci.edu/2", 80),
+        "word_counts": {"crawler": 1, "frontier": 3}, "fingerprint": ("c2", 2)})
+    store["h2"] = ("https://a.ics.uci.edu/2", True, None, None, None) # batch full: flushed
+    store.add_stats({"unique_pgs": ["https://a.ics.uci.edu/3"]})
+    store["h3"] = ("https://a.ics.uci.edu/3", True, None, None, None) # lost in the "crash"
+
+    reopened = open_store(tmp_path)
+    assert sorted(reopened.hashes()) == ["h1", "h2"]
+    assert list(reopened.stats_records()) == [{
+        "unique_pgs": ["https://a.ics.uci.edu/1", "https://a.ics.uci.edu/2"],
+        "longest_page": ["https://a.ics.uci.edu/2", 80],
+        "word_counts": {"crawler": 3, "frontier": 3},
+        "fingerprints": [["c1", 1], ["c2", 2]],
+    }]
+    reopened.close()
+
+
+def test_remove_deletes_the_wal_files(tmp_path):
+    store = open_store(tmp_path)
+    store["h1"] = ("https://a.ics.uci.edu/1", False, 0, 0.0, 0)
+    store.close()
+    UrlStore.remove(str(tmp_path / "frontier.db"))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_forwards_are_saved_with_the_completion_until_acknowledged(tmp_path):
+    store = open_store(tmp_path, flush_size=2)
+    store.add_forward(1, 2, "https://b.ics.uci.edu/1", 1)
+    store.add_forward(2, 0, "https://c.ics.uci.edu/1", 1)
+    store["h1"] = ("https://a.ics.uci.edu/1", False, 0, 0.0, 0)
+    store.ack_forwards(2) # acknowledged before it was flushed
+    store["h2"] = ("https://a.ics.uci.edu/2", True, None, None, None) # batch full: flushed
+    store.add_forward(3, 2, "https://b.ics.uci.edu/2", 2) # lost in the "crash" w its page
+
+    reopened = open_store(tmp_path)
+    assert reopened.forwards() == [(1, 2, "https://b.ics.uci.edu/1", 1)]
+    reopened.ack_forwards(1)
+    reopened.close()
+    assert open_store(tmp_path).forwards() == []
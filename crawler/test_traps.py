@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+
+from crawler.traps import TrapDetector, path_pattern
+from crawler.frontier import Frontier
+
+
+class Log(list):
+    ''' Stands in for a logger, keeps the messages. '''
+    def info(self, message):
+        self.append(message)
+
+    error = info
+
+
+@pytest.fixture
+def log(monkeypatch):
+    log = Log()
+    monkeypatch.setattr("crawler.traps.get_logger", lambda name: log)
+    monkeypatch.setattr("crawler.frontier.get_logger", lambda name: Log())
+    return log
+
+
+def test_path_pattern_ignores_case_and_digits():
+    assert path_pattern("https://WWW.ics.uci.edu:8080/Events/2024-01-02?a=1") == "www.ics.uci.edu/events/N-N-N"
+    assert path_pattern("https://www.ics.uci.edu/events/2025-11-30/") == "www.ics.uci.edu/events/N-N-N"
+
+
+def test_deep_and_repeating_paths_are_blocked(log):
+    traps = TrapDetector(max_depth=3, max_repeats=2)
+    assert traps.check("https://a.ics.uci.edu/a/b/c") is None
+    assert traps.check("https://a.ics.uci.edu/a/b/c/d") == "block"
+    assert traps.check("https://a.ics.uci.edu/a/b/a") is None
+    assert traps.check("https://a.ics.uci.edu/a/b/a/a") == "block"
+    assert len(log) == 2
+
+
+def test_parameter_values_over_the_budget_are_blocked(log):
+    traps = TrapDetector(max_param_values=3)
+    for page in (1, 2, 3, 1):
+        assert traps.check(f"https://a.ics.uci.edu/list?page={page}") is None
+    assert traps.check("https://a.ics.uci.edu/list?page=4") == "block"
+    assert traps.check("https://a.ics.uci.edu/list?page=2") is None # known values still pass
+    assert traps.check("https://a.ics.uci.edu/other?page=4") is None # per pattern
+    assert traps.report() == {"a.ics.uci.edu/list?page=": "block"}
+
+
+def test_low_value_pattern_is_throttled_then_blocked(log):
+    traps = TrapDetector(min_samples=4, throttle_rate=0.5, block_rate=0.8)
+    for low_value in (True, False, True):
+        traps.record_fetch("https://a.ics.uci.edu/day/1", low_value)
+    assert traps.check("https://a.ics.uci.edu/day/2") is None # under min_samples
+    traps.record_fetch("https://a.ics.uci.edu/day/1", False) # 2 of 4
+    assert traps.check("https://a.ics.uci.edu/day/3") == "throttle"
+    assert traps.check("https://a.ics.uci.edu/other") is None # the host isn't decided yet
+    for _ in range(8):
+        traps.record_fetch("https://a.ics.uci.edu/day/1", True) # 10 of 12
+    assert traps.check("https://a.ics.uci.edu/day/4") == "block"
+    assert traps.blocked("https://a.ics.uci.edu/day/1")
+    assert len(log) == 2
+
+
+def test_decisions_only_escalate(log):
+    traps = TrapDetector(min_samples=4, throttle_rate=0.5, block_rate=0.8)
+    for _ in range(4):
+        traps.record_fetch("https://a.ics.uci.edu/day/1", True)
+    for _ in range(20):
+        traps.record_fetch("https://a.ics.uci.edu/day/1", False) # rate falls to 1 of 6
+    assert traps.blocked("https://a.ics.uci.edu/day/2")
+    assert log == ["Block a.ics.uci.edu/day/N: 4 of 4 fetched pages were of low value."]
+
+
+def test_host_needs_5x_the_samples(log):
+    traps = TrapDetector(min_samples=4, throttle_rate=0.5, block_rate=0.8)
+    for page in "abcdefghijklmnopqrs":
+        traps.record_fetch(f"https://a.ics.uci.edu/{page}", True) # a pattern per page
+    assert not traps.blocked("https://a.ics.uci.edu/new")
+    traps.record_fetch("https://a.ics.uci.edu/t", True)
+    assert traps.blocked("https://a.ics.uci.edu/new")
+    assert traps.report() == {"host:a.ics.uci.edu": "block"}
+
+
+def test_blocked_url_is_only_checked_once(log, tmp_path):
+    config = SimpleNamespace(
+        time_delay=0.0, priority="depth", trap_detection=True, max_path_depth=2,
+        max_repeated_segments=2, max_param_values=50, trap_min_samples=20,
+        trap_throttle_rate=0.5, trap_block_rate=0.8, save_file=str(tmp_path / "frontier.db"),
+        durability="normal", flush_size=500, flush_interval=5.0, seen_index="digest",
+        bloom_capacity=1000, bloom_fp_rate=0.001, seed_urls=["https://a.ics.uci.edu/"])
+    frontier = Frontier(config, restart=True)
+    for _ in range(3):
+        frontier.add_urls(["https://a.ics.uci.edu/a/b/c"])
+    frontier.close()
+    assert len(log) == 1
+
+    config.seen_index = "bloom" # inexact index: the store has the final say, after a restart too
+    frontier = Frontier(config, restart=False)
+    frontier.add_urls(["https://a.ics.uci.edu/a/b/c"])
+    frontier.close()
+    assert len(log) == 1
@@ -0,0 +1,129 @@
+import re
+from collections import Counter
+from threading import Lock
+from urllib.parse import urlparse, parse_qsl
+
+from utils import get_logger
+from utils.metrics import metrics
+from crawler.scheduler import get_host
+
+DIGITS = re.compile(r"\d+")
+
+
+def path_pattern(url):
+    ''' Pattern of a url's path: host + path w every run of digits replaced by N, so
+        /events/2024-01-02 & /events/2025-11-30 are the same pattern.
+    '''
+    path = urlparse(url).path.lower()
+    segments = [DIGITS.sub("N", segment) for segment in path.split("/") if segment]
+    return get_host(url) + "/" + "/".join(segments)
+
+
+class TrapDetector(object):
+    ''' Online trap detector, learning from the crawl instead of a hand kept list.
+
+        When a url is found (check):
+            - a path deeper than max_depth segments, or w one segment repeated more than
+              max_repeats times (/a/b/a/b/a/...), is blocked
+            - every query parameter's distinct values are counted per path pattern, and
+              once a parameter had max_param_values of them, urls w new values are
+              blocked (calendars, session ids, sort orders, ...)
+        When a url was fetched (record_fetch), the share of low value pages (errors,
+        too little content, duplicates) is counted per path pattern & per host. After
+        min_samples fetches (5x that for a host), a pattern or host above throttle_rate
+        is throttled (its new urls go to the back of the frontier) and one above
+        block_rate is blocked (its urls, queued ones included, are dropped).
+
+        Every decision is logged to Logs/TRAPS.log. Pattern & host decisions only
+        escalate & last for the run, they're learned again after a restart. Thread safe.
+    '''
+    def __init__(self, max_depth=10, max_repeats=2, max_param_values=50,
+                 min_samples=20, throttle_rate=0.5, block_rate=0.8):
+        self.logger = get_logger("TRAPS")
+        self.max_depth = max_depth
+        self.max_repeats = max_repeats
+        self.max_param_values = max_param_values
+        self.min_samples = min_samples
+        self.throttle_rate = throttle_rate
+        self.block_rate = block_rate
+        self.lock = Lock()
+        self.param_values = dict() # (pattern, parameter) -> set of values (up to the budget)
+        self.fetches = dict() # pattern or "host:" + host -> [fetched, low value]
+        self.decisions = dict() # pattern or "host:" + host -> "throttle" or "block"
+
+    def _decide(self, key, decision, reason):
+        ''' Records & logs a decision (call w lock held), unless it's no escalation. '''
+        if self.decisions.get(key) == "block" or self.decisions.get(key) == decision:
+            return
+        self.decisions[key] = decision
+        metrics.count("traps_blocked" if decision == "block" else "traps_throttled")
+        self.logger.info(f"{decision.capitalize()} {key}: {reason}.")
+
+    def _decision(self, url, pattern):
+        decisions = (self.decisions.get(pattern), self.decisions.get("host:" + get_host(url)))
+        if "block" in decisions:
+            return "block"
+        if "throttle" in decisions:
+            return "throttle"
+        return None
+
+    def check(self, url):
+        ''' Looks at a newly found url & counts its query parameters.
+            Returns: None, "throttle" or "block"
+        '''
+        parsed = urlparse(url)
+        segments = [segment for segment in parsed.path.lower().split("/") if segment]
+        if len(segments) > self.max_depth:
+            metrics.count("traps_deep_paths")
+            self.logger.info(f"Block {url}: path deeper than {self.max_depth} segments.")
+            return "block"
+        if segments and Counter(segments).most_common(1)[0][1] > self.max_repeats:
+            metrics.count("traps_repeated_segments")
+            self.logger.info(f"Block {url}: path segment repeated over {self.max_repeats} times.")
+            return "block"
+        pattern = path_pattern(url)
+        with self.lock:
+            decision = self._decision(url, pattern)
+            if decision == "block":
+                return decision
+            for parameter, value in parse_qsl(parsed.query, keep_blank_values=True):
+                values = self.param_values.setdefault((pattern, parameter), set())
+                if value in values:
+                    continue
+                if len(values) >= self.max_param_values:
+                    self._decide(
+                        f"{pattern}?{parameter}=", "block",
+                        f"more than {self.max_param_values} distinct values")
+                    return "block"
+                values.add(value)
+            return decision
+
+    def blocked(self, url):
+        ''' Whether url's pattern or host was blocked (e.g. after the url was queued). '''
+        pattern = path_pattern(url)
+        with self.lock:
+            return self._decision(url, pattern) == "block"
+
+    def record_fetch(self, url, low_value):
+        ''' Counts a fetched page, low_value if it was an error, too short or a duplicate. '''
+        keys = ((path_pattern(url), self.min_samples), ("host:" + get_host(url), 5 * self.min_samples))
+        with self.lock:
+            for key, min_samples in keys:
+                counts = self.fetches.get(key)
+                if counts is None:
+                    counts = self.fetches[key] = [0, 0]
+                counts[0] += 1
+                counts[1] += bool(low_value)
+                if counts[0] < min_samples:
+                    continue
+                rate = counts[1] / counts[0]
+                reason = f"{counts[1]} of {counts[0]} fetched pages were of low value"
+                if rate >= self.block_rate:
+                    self._decide(key, "block", reason)
+                elif rate >= self.throttle_rate:
+                    self._decide(key, "throttle", reason)
+
+    def report(self):
+        ''' {pattern or host: decision} for the metrics snapshot. '''
+        with self.lock:
+            return dict(self.decisions)
@@ -1,10 +1,12 @@
 from threading import Thread
+import random
 
 from inspect import getsource
 from utils.download import download
 from utils import get_logger
+from utils.metrics import metrics
+from crawler.parse_pool import get_parse_pool, submit_page
 import scraper
-import time
 
 
 class Worker(Thread):
@@ -15,20 +17,56 @@ class Worker(Thread):
         # basic check for requests in scraper
         assert {getsource(scraper).find(req) for req in {"from requests import", "import requests"}} == {-1}, "Do not use requests in scraper.py"
         assert {getsource(scraper).find(req) for req in {"from urllib.request import", "import urllib.request"}} == {-1}, "Do not use urllib.request in scraper.py"
+        # PARSE_PROCESSES > 0: this thread only downloads, parsing runs in the shared process pool
+        self.parse_pool = (
+            get_parse_pool(config.parse_processes) if config.parse_processes else None)
         super().__init__(daemon=True)
-        
+
+    def log_download(self, tbd_url, resp):
+        # per-url lines are sampled (LOG_SAMPLE_RATE), errors are always logged by download
+        if random.random() < self.config.log_sample_rate:
+            self.logger.info(
+                f"Downloaded {tbd_url}, status <{resp.status}>, "
+                f"using cache {self.config.cache_server}.",
+                extra={"url": tbd_url, "status": resp.status})
+
+    def scrape(self, tbd_url, resp):
+        ''' scraper.scraper() in two halves (see scraper.process_page), so the page's delta
+            tells whether it was of low value.
+            Returns: (links to crawl, low value, the stats delta merged for the page or None)
+        '''
+        with metrics.timer("scrape"):
+            if self.parse_pool is None:
+                scraped_urls, delta = scraper.process_page(tbd_url, resp)
+            else:
+                scraped_urls, delta = submit_page(self.parse_pool, tbd_url, resp).result()
+            return self.accept(scraped_urls, delta)
+
+    @staticmethod
+    def accept(scraped_urls, delta):
+        ''' scraper.accept_page(). Returns: (links to crawl, low value, stats delta or None) '''
+        scraped_urls = scraper.accept_page(scraped_urls, delta)
+        low_value = scraper.is_low_value(delta)
+        return scraped_urls, low_value, None if low_value else delta
+
     def run(self):
         while True:
             tbd_url = self.frontier.get_tbd_url()
             if not tbd_url:
                 self.logger.info("Frontier is empty. Stopping Crawler.")
                 break
-            resp = download(tbd_url, self.config, self.logger)
-            self.logger.info(
-                f"Downloaded {tbd_url}, status <{resp.status}>, "
-                f"using cache {self.config.cache_server}.")
-            scraped_urls = scraper.scraper(tbd_url, resp)
-            for scraped_url in scraped_urls:
-                self.frontier.add_url(scraped_url)
-            self.frontier.mark_url_complete(tbd_url)
-            time.sleep(self.config.time_delay)
+            low_value, fetched, stats = None, True, None
+            try:
+                with metrics.timer("download"):
+                    resp = download(tbd_url, self.config, self.logger)
+                fetched = not resp.from_cache
+                metrics.count(f"status_{resp.status}")
+                self.log_download(tbd_url, resp)
+                scraped_urls, low_value, stats = self.scrape(tbd_url, resp)
+                self.frontier.add_urls(scraped_urls, parent=tbd_url)
+            except Exception:
+                # the url still has to be marked complete, or the other workers wait on it forever
+                self.logger.exception(f"Failed to process {tbd_url}.")
+            # politeness delay is per host & enforced by the frontier (not for cached pages),
+            # the page's stats are saved w its completion
+            self.frontier.mark_url_complete(tbd_url, low_value, fetched, stats)
@@ -3,7 +3,12 @@ from argparse import ArgumentParser
 
 from utils.server_registration import get_cache_server
 from utils.config import Config
+from utils import configure_logging
 from crawler import Crawler
+from crawler.worker import Worker
+from crawler.async_worker import AsyncWorker
+from crawler.distributed import run_distributed
+import os
 import scraper
 
 
@@ -11,9 +16,23 @@ def main(config_file, restart):
     cparser = ConfigParser()
     cparser.read(config_file)
     config = Config(cparser)
-    config.cache_server = get_cache_server(config, restart)
-    crawler = Crawler(config, restart)
+    configure_logging(config)
+    if not config.cache_server: # CACHE_SERVER isn't set, register w the real one
+        config.cache_server = get_cache_server(config, restart)
+    if config.partitions > 1:
+        # one crawler process per partition, merged into the usual stats files at the end
+        stats_logs = run_distributed(config, restart, config.partitions)
+        scraper.merge_stats_files(stats_logs, scraper.STATS_LOG)
+        scraper.load_stats(scraper.STATS_LOG)
+        scraper.save_stats_to_file("stats.json")
+        return
+    # stats are saved in & resumed from the frontier's store, the log is written at the end
+    if restart and os.path.exists(scraper.STATS_LOG):
+        os.remove(scraper.STATS_LOG)
+    worker_factory = AsyncWorker if config.fetch_mode == "async" else Worker
+    crawler = Crawler(config, restart, worker_factory=worker_factory)
     crawler.start()
+    scraper.save_stats_log()
     scraper.save_stats_to_file("stats.json")  # save stats to json file
 
 
@@ -1,15 +1,37 @@
-import re, string, json
+import os, re, string, json
+from collections import Counter
+from itertools import repeat
+from threading import Lock
 from urllib.parse import urlparse, urldefrag, urljoin
-from bs4 import BeautifulSoup
 from utils.response import Response
+from utils.page import Page, parse_page, is_html_content_type, estimate_word_count
+from utils.urlfilter import UrlFilter
+from utils.fingerprint import fingerprint, DuplicateIndex
+from utils.stats_store import write_records, iter_records, compact
+from utils.counters import make_counter
+from utils.metrics import metrics
+
+# word counter: "exact" counts every word, "approximate" keeps the WORD_COUNTER_CAPACITY
+# most common words in fixed memory (Count-Min Sketch + Space-Saving, see utils/counters.py)
+WORD_COUNTER = "exact"
+WORD_COUNTER_CAPACITY = 10_000
 
 # dictionary to keep track of stat values
 stats = {
     "unique_pgs": set(),
     "longest_page": ("", 0), #(url, wordcount)
-    "word_counts": {}, #{word: count}
-    "subdomains": {}, #{subdomain: unqiuepages}
+    "word_counts": make_counter(WORD_COUNTER, WORD_COUNTER_CAPACITY), #{word: count}
+    "subdomains": {}, #{subdomain: unqiuepages}, kept up to date as unique pgs are added
 }
+# workers run scraper() concurrently, every update to stats goes through merge_stats() under this lock
+stats_lock = Lock()
+
+# during a crawl each page's delta is saved w the page's completion in the frontier's
+# store (see Frontier.mark_url_complete) & restored from there on resume; at the end all
+# of stats is written to STATS_LOG (see utils/stats_store.py), which is what gets merged
+# across partitions & read by testscraper.py
+STATS_LOG = "stats.log.gz"
+STATS_RECORD_SIZE = 10_000 # max urls/word counts/fingerprints per stats log record
 
 # load stopwords once
 def load_stopwords(path: str):
@@ -17,6 +39,18 @@ def load_stopwords(path: str):
         return {word.strip() for word in file}
 STOP_WORDS = load_stopwords("stopwords.txt")
 
+# backend used by utils.page.parse_page: "html.parser", "lxml" or "stream"
+PARSER_BACKEND = "html.parser"
+
+MAX_FILE_SIZE = 1_000_000 # 1 MB, larger pages are skipped
+STREAM_PARSE_SIZE = 500_000 # pages this big (up to MAX_FILE_SIZE) use the streaming parser
+MIN_WORDS = 50 # pages w fewer words are skipped
+
+# pgs this similar (SimHash, 1.0 = exact copies only) to an already crawled pg aren't
+# counted & their links aren't followed
+NEAR_DUPLICATE_THRESHOLD = 0.9 # up to 6 of 64 bits differ
+duplicates = DuplicateIndex(NEAR_DUPLICATE_THRESHOLD)
+
 def scraper(url: str, resp: Response) -> list:
     """ Processes a downloaded page, returning the next valid links to crawl.
     url: the URL that was added to the frontier and downloaded from the cache
@@ -24,41 +58,59 @@ def scraper(url: str, resp: Response) -> list:
     resp: response given by the cache server for the requested URL 
         (an object of type Response)
     """
+    links, delta = process_page(url, resp)
+    return accept_page(links, delta)
+
+def process_page(url: str, resp: Response) -> tuple:
+    """ Does all of scraper()'s work w/o touching the global stats, so it can also run in a
+        parse process (see crawler/parse_pool.py).
+        Args:
+            url - the URL that was added to the frontier and downloaded from the cache
+            resp - response given by the cache server for the requested URL
+        Returns: (links, delta) - the next valid links to crawl & the page's stats delta
+            for accept_page() (None if the page was rejected before parsing)
+    """
     if resp.status == 200 and resp.raw_response and resp.raw_response.content:  # onlys URLs with 200 status code & has content/a response
-        # extract pg's text
-        html = BeautifulSoup(resp.raw_response.content, "html.parser", from_encoding='utf-8') # encoding to handle char encoding errors
-        pg_text = html.get_text(separator=" ")
+        content = resp.raw_response.content
+
+        # reject before parsing: very large files (esp if they hv low info value), non-html
+        # content & pgs that can't reach MIN_WORDS even by a generous estimate
+        if len(content) > MAX_FILE_SIZE: # comparing size in bytes
+            return [], None
+        if not is_html_content_type(getattr(resp.raw_response, "headers", None)):
+            return [], None
+        if estimate_word_count(content) < MIN_WORDS:
+            return [], None
+
+        # parse the pg once: text, tokens, word count & hrefs all come from this
+        # (pgs near the size limit go through the bounded-memory streaming parser, no DOM)
+        backend = "stream" if len(content) > STREAM_PARSE_SIZE else PARSER_BACKEND
+        with metrics.timer("parse"): # only reported when parsing in the worker threads
+            page = parse_page(content, backend)
 
         # detect & avoid sets of similar pgs w no info (pgs w barely any content)
-        if len(pg_text.split()) < 50: # defined threashold < 50 words
-            return []
-
-        # detect & avoid crawling very large files esp if they hv low info value
-        MAX_FILE_SIZE = 1_000_000 # 1 MB
-        if len(resp.raw_response.content) > MAX_FILE_SIZE: # comparing size in bytes
-            return []
+        if page.word_count < MIN_WORDS: # defined threashold < 50 words
+            return [], None
 
+        delta = {}
         if is_valid(url): # only valid URLs for report
-            # for finding num of unique pgs (remove fragment & add url to set)
-            find_unique_pages(resp)
-
-            # for finding longest pg word-wise (extract only text from html)
-            find_longest_page(resp)
+            # unique pg, longest pg & 50 most common words
+            delta = page_stats(resp, page)
+        delta["fingerprint"] = fingerprint(page.tokens) # checked against duplicates by accept_page()
 
-            # for finding 50 most common words 
-            update_word_counts(pg_text)
-
-        links = extract_next_links(url, resp)
-        return [link for link in links if is_valid(link)]
+        links = extract_next_links(url, resp, page)
+        with metrics.timer("filter"):
+            return is_valid_many(links), delta
     
     # handle cases where status code isn't 200, no content/responswe
-    return []
+    return [], None
 
-def extract_next_links(url: str, resp: Response) -> list:
+def extract_next_links(url: str, resp: Response, page: Page = None) -> list:
     """ Extracts all <a href> from a page's HTML content and returns them as a list of strings.
         Args:
             url - the URL that was used to get the page
             resp - response from server
+            page - the already parsed page (parsed here if not given)
         Returns: a list with the hyperlinks (as strings) scrapped from resp.raw_response.content
     """
     hyperlinks = [] # list to store all hyperlinks gathered 
@@ -67,12 +119,12 @@ def extract_next_links(url: str, resp: Response) -> list:
     if resp.status != 200 or not resp.raw_response or not resp.raw_response.content: 
         return []
 
-    # parse HTML
-    html = BeautifulSoup(resp.raw_response.content, 'html.parser')
+    # parse HTML (only if the caller hasn't already)
+    if page is None:
+        page = parse_page(resp.raw_response.content, PARSER_BACKEND)
 
     # extract hyperlinks: <a href>
-    for hyperlink in html.find_all('a'):
-        link = hyperlink.get('href')
+    for link in page.hrefs:
         if link: # prevents empty links
             link = link.strip() # get rid of uncessary white space
 
@@ -91,109 +143,153 @@ def extract_next_links(url: str, resp: Response) -> list:
         
     return hyperlinks
 
+# URL rules, compiled once into URL_FILTER (see utils/urlfilter.py)
+ALLOWED_DOMAINS = [
+    "ics.uci.edu",
+    "cs.uci.edu",
+    "informatics.uci.edu",
+    "stat.uci.edu"
+]
+BAD_EXTENSIONS = [ # regex fragments, matched at the end of the lowercased path
+    "css", "js", "bmp", "gif", "jpe?g", "jpg", "ico", # added jpg
+    "png", "img", "tiff?", "mid", "mp2", "mp3", "mp4", "mpg", # added mpg, img
+    "wav", "avi", "mov", "mpeg", "ram", "m4v", "mkv", "ogg", "ogv", "pdf", "txt", # added txt
+    "ps", "eps", "tex", "ppt", "pptx", "doc", "docx", "xls", "xlsx", "names", "ppsx", "pps", # added ppsx, pps
+    "data", "dat", "exe", "bz2", "tar", "msi", "bin", "7z", "psd", "dmg", "iso", "bib", # added bib
+    "epub", "dll", "cnf", "tgz", "sha1", "webp", "sql", # added webp, sql
+    "thmx", "mso", "arff", "rtf", "jar", "csv", "tsv", "sh", "war", "c", "cpp", "h", "java", "py", "php", "rss", # added tsv, sh, war, c cpp h java py php rss (code files)
+    "rm", "smil", "wmv", "swf", "wma", "zip", "rar", "gz",
+]
+PATH_TRAPS = [ # regexes searched in the lowercased path: infinite traps & low value/repetitive pages
+    r"/events?/", # calendar/event pages
+    r"/(fall|spring|winter|summer)-\d{4}-week-\d+", # ex: fall-2025-week-3
+    r"/(fall|spring|winter|summer)-quarter-week-\d+", # ex: fall-quarter-week-3
+    r"/\d{4}([/-]\d{2}){2}$", # ex: 2025-2-06
+    r"week$",
+    r"/[a-z]+\d+\.html$", # numerical trap, ex: r25.html
+    r"/page/", r"junkyard", # repeated pages, giving barely any new info
+    r"/pubs?/", r"publications", # low textual content
+    r"~dechter/", # pg not found and/or low value
+]
+QUERY_TRAPS = [re.escape(param) for param in [ # substrings of the lowercased query
+    "do=", "idx=", "id=", "version=", "from=", "precision=", "rev=", "p=", # low info value & near-dupe pgs
+    "requesttracker", # repeated query params
+    "/ml/datasets", "datasets", # filter out large ML datasets
+]]
+HOST_TRAPS = ["grape"] # ton of low-value repetitive content
+
+URL_FILTER = UrlFilter(
+    ALLOWED_DOMAINS, BAD_EXTENSIONS, PATH_TRAPS, QUERY_TRAPS, HOST_TRAPS,
+    max_url_length=200, max_questions=1, max_ampersands=4) # very long URLs, lots of ? or &
+
 def is_valid(url: str) -> bool:
     """ Decides whether a URL should be crawled. Returns True if the URL is valid, False otherwise.
+        Rules are in ALLOWED_DOMAINS, BAD_EXTENSIONS, PATH_TRAPS, QUERY_TRAPS & HOST_TRAPS.
         Args:
             url - the URL to validate
         Returns: bool - True whether if URL should be crawled, False if otherwise
     """
     try:
-        parsed = urlparse(url)
-
-        # Valid for only http/https
-        if parsed.scheme not in set(["http", "https"]):
-            return False
-        
-        # if http or https appears twice --> malformed URL
-        if parsed.path.count("http") > 0 or parsed.path.count("https") > 0:
-            return False
-
-        # Use hostname for domain
-        if not parsed.hostname:
-            return False
-
-        # Valid for allowed domains
-        allowed_domains = [
-            "ics.uci.edu",
-            "cs.uci.edu",
-            "informatics.uci.edu",
-            "stat.uci.edu"
-        ]
-
-        # Check if the domain matches the allowed domains
-        if not any (parsed.hostname == domain or parsed.hostname.endswith("." + domain) for domain in allowed_domains):
-            return False
-
-        # Check for bad files
-        if re.match(
-            r".*\.(css|js|bmp|gif|jpe?g|jpg|ico" #added jpg
-            + r"|png|img|tiff?|mid|mp2|mp3|mp4|mpg" # added mpg, img
-            + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf|txt" # added txt
-            + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names|ppsx|pps" # added ppsx, pps
-            + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso|bib" # added bib
-            + r"|epub|dll|cnf|tgz|sha1|webp|sql" # added webp, sql
-            + r"|thmx|mso|arff|rtf|jar|csv|tsv|sh|war|c|cpp|h|java|py|php|rss" # added tsv, sh, war, c cpp h java py php rss (code files)
-            + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower()):
-            return False
-        
-        # Check for infinite traps & low value/repetitive pages
-        parsed_query = parsed.query.lower()
-        calendar_pattern = re.compile(r"/(fall|spring|winter|summer)-\d{4}-week-\d+") # ex: fall-2025-week-3
-        quarter_pattern = re.compile(r"/(fall|spring|winter|summer)-quarter-week-\d+") # ex: fall-quarter-week-3
-        date_pattern = re.compile(r"/\d{4}([/-]\d{2}){2}$") # ex: 2025-2-06
-        numerical_pattern = re.compile(r"/[a-z]+\d+\.html$") # ex: r25.html
-
-        if "/events/" in parsed.path.lower() or "/event/" in parsed.path.lower() or calendar_pattern.search(parsed.path.lower()) \
-            or date_pattern.search(parsed.path.lower()) or quarter_pattern.search(parsed.path.lower()) \
-            or parsed.path.lower().endswith("week"): # calendar/event/date pattern 
-            return False
-        if "grape" in parsed.hostname: # ton of low-value repetitive content
-            return False
-        if numerical_pattern.search(parsed.path.lower()): # numerical trap 
-            return False
-        if any(param in parsed_query for param in ['do=', 'idx=', 'id=', 'version=', 'from=', 'precision=', 'rev=', 'p=']): # low info value & near-dupe pgs
-            return False
-        if 'requesttracker' in parsed_query or "/page/" in parsed.path.lower() or "junkyard" in parsed.path.lower(): # repeated query params, giving barely any new info
-            return False
-        if '/ml/datasets' in parsed_query or 'datasets' in parsed_query: # filter out large ML datasets
-            return False
-        if "/pub/" in parsed.path.lower() or "publications" in parsed.path.lower() or "/pubs/" in parsed.path.lower(): # low textual content
-            return False
-        if "~dechter/" in parsed.path.lower(): # pg not found and/or low value
-            return False
-        if len(url) > 200: # very long URLs (defined threashold > 200 chars)
-            return False
-        if url.count('?') > 1 or url.count('&') > 4: # lots of ? or &
-            return False
-
-        return True
-
+        return URL_FILTER.is_valid(url)
     except TypeError:
-        print ("TypeError for ", parsed)
+        print ("TypeError for ", url)
         raise
 
+def is_valid_many(urls) -> list:
+    """ Batch version of is_valid.
+        Args:
+            urls - iterable of URLs to validate
+        Returns: list of the URLs that should be crawled (same order)
+    """
+    return URL_FILTER.is_valid_many(urls)
+
 # Functions for getting the report stats
+def page_stats(resp: Response, page: Page) -> dict:
+    """ Stats delta of one valid page, merged into stats by merge_stats().
+        Args:
+            resp - response from server
+            page - the parsed page
+        Returns: dict w the page's unique url, its word count & its word counts
+    """
+    return {
+        "unique_pgs": [unique_url(resp.url)],
+        "longest_page": (resp.url, page.word_count),
+        "word_counts": count_words(page.text),
+    }
+
+def accept_page(links: list, delta: dict) -> list:
+    """ Second half of scraper(), run where the shared state lives (not in a parse process):
+        drops exact & near duplicate pages, otherwise merges the page's stats.
+        Args:
+            links, delta - the result of process_page()
+        Returns: the links to crawl ([] for duplicates, which get delta["duplicate"] set)
+    """
+    if delta and "fingerprint" in delta:
+        duplicate = duplicates.check_and_add(*delta["fingerprint"])
+        if duplicate:
+            delta["duplicate"] = duplicate # "exact" or "near", see is_low_value()
+            return []
+    merge_stats(delta)
+    return links
+
+def is_low_value(delta: dict) -> bool:
+    """ Whether a page was of low value: an error, rejected (too big, not html, too few
+        words) or a duplicate.
+        Args:
+            delta - the page's delta, after accept_page()
+    """
+    return not delta or "duplicate" in delta
+
+def merge_stats(delta: dict):
+    """ Merges a stats delta (from page_stats(), possibly computed in another process) into stats.
+        Args:
+            delta - dict w any of the keys unique_pgs, longest_page & word_counts (or None)
+    """
+    if not delta:
+        return
+    with stats_lock:
+        unique_pgs, subdomains = stats["unique_pgs"], stats["subdomains"]
+        for url in delta.get("unique_pgs", ()):
+            if url not in unique_pgs: # first time seen: count it for its subdomain too
+                unique_pgs.add(url)
+                domain = subdomain(url)
+                if domain:
+                    subdomains[domain] = subdomains.get(domain, 0) + 1
+        longest_page = delta.get("longest_page")
+        if longest_page and longest_page[1] > stats["longest_page"][1]:
+            stats["longest_page"] = tuple(longest_page)
+        stats["word_counts"].add_counts(delta.get("word_counts", {}))
+
+def subdomain(url: str) -> str:
+    """ The uci.edu subdomain a unique page is counted under (None if it isn't one). """
+    domain = urlparse(url).hostname #doesn't include the port
+    if domain and domain.endswith("uci.edu"):
+        return domain
+    return None
+
+def unique_url(url: str) -> str:
+    """ The form of a URL used for counting unique pages. """
+    return urldefrag(url)[0].lower().rstrip("/") # lowercase & remove trailing slash
+
 def find_unique_pages(resp: Response):
     """ Finds and tracks unique valid pages. Duplicate URLs are ignored.
         Args:
             resp - response from server
     """
     # for finding num of unique pgs (remove fragment & add url to set)
-    unfragmented_url = urldefrag(resp.url)[0].lower().rstrip("/") # lowercase & remove trailing slash
-    stats["unique_pgs"].add(unfragmented_url)
+    merge_stats({"unique_pgs": [unique_url(resp.url)]})
 
-def find_longest_page(resp: Response):
+def find_longest_page(resp: Response, page: Page = None):
     """ Finds the longest page based on word count.
-        Parses HTML from response and counts visible words.
+        Parses HTML from response (unless already parsed) and counts visible words.
         Args:
             resp - the response from server
+            page - the already parsed page (parsed here if not given)
     """
     # for finding longest pg word-wise (extract only text from html)
-    html = BeautifulSoup(resp.raw_response.content, 'html.parser')
-    text = html.get_text(separator=" ") # split words by space for effective counting
-    num_words = len(text.split())
-    if num_words > stats["longest_page"][1]: 
-        stats["longest_page"] = (resp.url, num_words)
+    if page is None:
+        page = parse_page(resp.raw_response.content, PARSER_BACKEND)
+    merge_stats({"longest_page": (resp.url, page.word_count)})
 
 def tokenize(text: str):
     """Helper func for update_word_counts().
@@ -206,47 +302,155 @@ def tokenize(text: str):
     # (.word) --> word
     # don't --> don't (keep punc in the middle of the word)
     # convert to lowercase & remove punctuation at front and end of word (word alr split by space)
-    return [word.lower().strip(string.punctuation) for word in text.split() if word.strip(string.punctuation)] # filter out empty strs
+    # (lowering the whole text once gives the same words as lowering each one)
+    return [word for word in split_words(text) if word] # filter out empty strs
+
+def split_words(text: str):
+    """ Lowercased, punctuation-stripped words of text, empty strs included. """
+    return map(str.strip, text.lower().split(), repeat(string.punctuation))
+
+def count_words(text: str) -> dict:
+    """ Counts the words on one page (w/o touching stats).
+        Args:
+            text - the text taken from the HTML page
+        Returns: dict {word: count}
+    """
+    # count every token in C (Counter) first, then filter each distinct token only once
+    # (a Counter keeps first-seen order, like counting token by token did)
+    return {
+        token: count for token, count in Counter(split_words(text)).items()
+        if len(token) > 1 and token not in STOP_WORDS and not token.isnumeric() and any(c.isalpha() for c in token) # exclude numbers, char != word, empty strs, no special chars
+    }
 
 def update_word_counts(text: str):
     """ Updates the word count for each word on the page.
         Args:
             text - the text taken from the HTML page
     """
-    tokens = tokenize(text)
-    for token in tokens: 
-        token = token.strip()
-        if token and len(token) > 1 and any(c.isalpha() for c in token) and token not in STOP_WORDS and not token.isnumeric(): # exclude numbers, char != word, no spaces, no special chars
-            stats["word_counts"][token] = stats["word_counts"].get(token, 0) + 1
+    merge_stats({"word_counts": count_words(text)})
 
 def find_50_most_common_words():
     """ Finds 50 most common words from all the valid pages crawled.
         Returns: list of tuples (word, count) sorted by count in descending order
     """
-    return sorted(stats["word_counts"].items(), key=lambda x: x[1], reverse=True)[:50]
+    with stats_lock:
+        return stats["word_counts"].top(50)
 
 def find_total_subdomains() -> list:
     """ Finds all subdomains and counts of how many unique pages are found.
-        Groups unique pages by their subdomain.
+        The counts are kept up to date by merge_stats() as unique pages are added, so this
+        is cheap, can be called any number of times & works during a crawl.
         Returns: a list of tuples (subdomain, count) sorted alphabetically
     """
     # for finding num of subdomains
-    unique_pgs = stats["unique_pgs"]
-    for url in unique_pgs:
-        parsed_url = urlparse(url)
-        domain = parsed_url.hostname #doesn't include the port
-        if domain and domain.endswith("uci.edu"):
-            stats["subdomains"][domain] = stats["subdomains"].get(domain, 0) + 1
-    return sorted(stats["subdomains"].items())
+    with stats_lock:
+        return sorted(stats["subdomains"].items())
+
+def combine_deltas(deltas) -> dict:
+    """ Combines stats deltas (or stats log records) into one delta.
+        Args:
+            deltas - iterable of deltas
+        Returns: dict w unique_pgs, longest_page & word_counts, plus fingerprints (the pages'
+            (checksum, simhash), to rebuild duplicates on resume) if the deltas had any
+            ({} if there were no deltas)
+    """
+    unique_pgs, longest_page, word_counts, fingerprints = set(), None, {}, []
+    for delta in deltas:
+        unique_pgs.update(delta.get("unique_pgs", ()))
+        page = delta.get("longest_page")
+        if page and (longest_page is None or page[1] > longest_page[1]):
+            longest_page = tuple(page)
+        for token, count in delta.get("word_counts", {}).items():
+            word_counts[token] = word_counts.get(token, 0) + count
+        if "fingerprint" in delta:
+            fingerprints.append(tuple(delta["fingerprint"]))
+        fingerprints.extend(tuple(fp) for fp in delta.get("fingerprints", ()))
+    if not unique_pgs and longest_page is None and not word_counts and not fingerprints:
+        return {}
+    combined = {"unique_pgs": sorted(unique_pgs), "longest_page": longest_page or ("", 0), "word_counts": word_counts}
+    if fingerprints:
+        combined["fingerprints"] = fingerprints
+    return combined
+
+def restore_stats(record: dict):
+    """ Merges saved stats (a stats log record or a record from the frontier's store) into
+        stats, and adds the pages' fingerprints back to duplicates.
+        Args:
+            record - a combined delta, see combine_deltas()
+    """
+    merge_stats(record)
+    for checksum, simhash in record.get("fingerprints", ()):
+        duplicates.add(checksum, simhash)
+
+def split_stats(record: dict, size: int = None):
+    """ Splits a combined delta into records of at most size urls, word counts or
+        fingerprints each, so a stats log is read (& held in memory) a record at a time.
+        Args:
+            record - a combined delta, see combine_deltas()
+            size - max items per record (STATS_RECORD_SIZE by default)
+        Yields: deltas that combine back into record
+    """
+    size = size or STATS_RECORD_SIZE
+    if record.get("longest_page"):
+        yield {"longest_page": record["longest_page"]}
+    unique_pgs = record.get("unique_pgs", [])
+    for start in range(0, len(unique_pgs), size):
+        yield {"unique_pgs": unique_pgs[start:start + size]}
+    word_counts = list(record.get("word_counts", {}).items())
+    for start in range(0, len(word_counts), size):
+        yield {"word_counts": dict(word_counts[start:start + size])}
+    fingerprints = record.get("fingerprints", [])
+    for start in range(0, len(fingerprints), size):
+        yield {"fingerprints": fingerprints[start:start + size]}
+
+def save_stats_log(path: str = None):
+    """ Writes all of stats to the stats log, replacing the log (in records of at most
+        STATS_RECORD_SIZE urls/word counts, see split_stats()).
+        Args:
+            path - the stats log (STATS_LOG by default)
+    """
+    with stats_lock:
+        record = {
+            "unique_pgs": sorted(stats["unique_pgs"]),
+            "longest_page": stats["longest_page"],
+            "word_counts": dict(stats["word_counts"].items()),
+        }
+    write_records(path or STATS_LOG, split_stats(record))
+
+def load_stats(*paths):
+    """ Merges saved stats into stats, streaming stats logs record by record. A .json file
+        (the save_stats_to_file() report) is also accepted.
+        Args:
+            paths - stats logs or .json reports (missing ones are skipped)
+    """
+    for path in paths:
+        if path.endswith(".json"):
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as file:
+                    restore_stats(json.load(file))
+            continue
+        for record in iter_records(path):
+            restore_stats(record)
+
+def merge_stats_files(paths, out_path: str):
+    """ Merges stats logs from several runs/processes into one compact log.
+        Args:
+            paths - stats logs to merge
+            out_path - the merged log
+    """
+    compact(paths, out_path, lambda records: split_stats(combine_deltas(records)))
 
 def save_stats_to_file(path="stats.json"):
     """Saves stats gathered from crawl to stats.json"""
-    stats_to_save = {
-        "unique_pgs": list(stats["unique_pgs"]),
-        "longest_page": stats["longest_page"],
-        "word_counts": stats["word_counts"],
-        "subdomains": stats["subdomains"]
-    }
+    with stats_lock:
+        stats_to_save = {
+            "unique_pgs": list(stats["unique_pgs"]),
+            "longest_page": stats["longest_page"],
+            "word_counts": dict(stats["word_counts"].items()),
+            "word_count_error": stats["word_counts"].error_bounds(),
+            "subdomains": dict(stats["subdomains"]),
+            "duplicates": duplicates.report(),
+        }
 
     with open(path, "w", encoding="utf-8") as file:
         json.dump(stats_to_save, file, ensure_ascii=False, indent=4)
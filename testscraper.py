@@ -1,18 +1,17 @@
-# File to get and print statistics from stats.json after crawling
+# File to get and print statistics after crawling
+# usage: python testscraper.py [stats files...] (stats logs and/or .json reports, merged)
 
-import json
+import os, sys
 import scraper
 
-# Load stats from your saved JSON
-with open("stats.json", "r", encoding="utf-8") as f:
-    loaded_stats = json.load(f)
-    
-scraper.stats.update(loaded_stats) # update stats dictionary with data from crawl
+# Load stats from the stats log(s), streamed record by record (or from the saved JSON)
+paths = sys.argv[1:] or [scraper.STATS_LOG if os.path.exists(scraper.STATS_LOG) else "stats.json"]
+scraper.load_stats(*paths) # merge data from crawl(s) into the stats dictionary
 print(len(scraper.stats["unique_pgs"]))
 print(scraper.stats["longest_page"][0])
 print(scraper.stats["longest_page"][1])
 print(scraper.find_50_most_common_words())
-print(scraper.find_total_subdomains()) #only call once or counts will accumulate
+print(scraper.find_total_subdomains())
 print(len(scraper.find_total_subdomains())) #num subdomains
 
 for word, count in scraper.find_50_most_common_words():
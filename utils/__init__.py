@@ -1,24 +1,138 @@
 import os
+import json
+import queue
+import atexit
 import logging
+import logging.handlers
+import threading
 from hashlib import sha256
 from urllib.parse import urlparse
 
-def get_logger(name, filename=None):
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+# Logging runs off the worker threads: every logger gets one QueueHandler (added once,
+# however often get_logger is called) & a single QueueListener thread does the formatting
+# & writing, through buffered file handlers. See configure_logging for the options.
+_log_queue = queue.SimpleQueue()
+_log_lock = threading.Lock()
+_log_listener = None
+_log_settings = {"format": "text", "buffer": 100, "suffix": ""}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# attributes every LogRecord has, anything else was passed in extra= & is structured data
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "logfile"}
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per line: time, logger, level, message & any extra= fields. """
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """ Puts records on the queue as they are. QueueHandler.prepare would format them on
+        the logging thread & drop exc_info, so the listener's formatters (JsonFormatter's
+        "exception" field) would never see the traceback. The queue never leaves the
+        process, so nothing has to be made picklable.
+    """
+    def prepare(self, record):
+        return record
+
+
+class _FileRouter(logging.Handler):
+    """ Runs on the listener thread, sends each record to a buffered handler for its log
+        file (Logs/<filename><suffix>.log), created on first use.
+    """
+    def __init__(self):
+        super().__init__()
+        self.files = dict()
+
+    def emit(self, record):
+        handler = self.files.get(record.logfile)
+        if handler is None:
+            file_handler = logging.FileHandler(
+                f"Logs/{record.logfile}{_log_settings['suffix']}.log")
+            file_handler.setFormatter(
+                JsonFormatter() if _log_settings["format"] == "json" else logging.Formatter(TEXT_FORMAT))
+            # write in batches, but errors right away
+            handler = logging.handlers.MemoryHandler(
+                _log_settings["buffer"], flushLevel=logging.ERROR, target=file_handler)
+            self.files[record.logfile] = handler
+        handler.handle(record)
+
+    def flush(self):
+        for handler in self.files.values():
+            handler.flush()
+
+    def close(self):
+        for handler in self.files.values():
+            target = handler.target # MemoryHandler.close() flushes & then drops it
+            handler.close()
+            target.close()
+        self.files.clear()
+        super().close()
+
+
+def _start_listener():
+    global _log_listener
     if not os.path.exists("Logs"):
         os.makedirs("Logs")
-    fh = logging.FileHandler(f"Logs/{filename if filename else name}.log")
-    fh.setLevel(logging.DEBUG)
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-       "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    fh.setFormatter(formatter)
-    ch.setFormatter(formatter)
-    # add the handlers to the logger
-    logger.addHandler(fh)
-    logger.addHandler(ch)
+    stream = logging.StreamHandler()
+    stream.setLevel(logging.INFO)
+    stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+    _log_listener = logging.handlers.QueueListener(
+        _log_queue, _FileRouter(), stream, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """ Writes out everything still queued or buffered & stops the listener thread. """
+    global _log_listener
+    with _log_lock:
+        if _log_listener is not None:
+            _log_listener.stop()
+            for handler in _log_listener.handlers:
+                handler.flush()
+                handler.close()
+            _log_listener = None
+
+
+def configure_logging(config, suffix=""):
+    """ Applies the [LOGGING] options of config.ini (before the first get_logger call).
+        Args:
+            config - Config
+            suffix - appended to every log file name, so processes that crawl side by side
+                (crawler/distributed.py) don't write to the same files
+    """
+    _log_settings["format"] = config.log_format
+    _log_settings["buffer"] = config.log_buffer
+    _log_settings["suffix"] = suffix
+
+
+def get_logger(name, filename=None):
+    logger = logging.getLogger(name)
+    with _log_lock:
+        if _log_listener is None:
+            _start_listener()
+        if not getattr(logger, "queue_handler", None):
+            logger.setLevel(logging.INFO)
+            handler = _QueueHandler(_log_queue)
+            logfile = filename if filename else name
+            def add_logfile(record):
+                record.logfile = logfile
+                return True
+            handler.addFilter(add_logfile)
+            logger.addHandler(handler)
+            logger.propagate = False
+            logger.queue_handler = handler
     return logger
 
 
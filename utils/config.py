@@ -9,11 +9,64 @@ class Config(object):
         assert re.match(r"^[a-zA-Z0-9_ ,]+$", self.user_agent), "User agent should not have any special characters outside '_', ',' and 'space'"
         self.threads_count = int(config["LOCAL PROPERTIES"]["THREADCOUNT"])
         self.save_file = config["LOCAL PROPERTIES"]["SAVE"]
+        self.parse_processes = config.getint("LOCAL PROPERTIES", "PARSE_PROCESSES", fallback=0)
+
+        # optional [PERSISTENCE] section, see config.ini
+        self.durability = config.get("PERSISTENCE", "DURABILITY", fallback="normal").strip().lower()
+        assert self.durability in ("off", "normal", "full"), "DURABILITY should be off, normal or full"
+        self.flush_size = config.getint("PERSISTENCE", "FLUSH_SIZE", fallback=500)
+        self.flush_interval = config.getfloat("PERSISTENCE", "FLUSH_INTERVAL", fallback=5.0)
+        self.seen_index = config.get("PERSISTENCE", "SEEN_INDEX", fallback="digest").strip().lower()
+        assert self.seen_index in ("digest", "bloom"), "SEEN_INDEX should be digest or bloom"
+        self.bloom_capacity = config.getint("PERSISTENCE", "BLOOM_CAPACITY", fallback=1_000_000)
+        self.bloom_fp_rate = config.getfloat("PERSISTENCE", "BLOOM_FP_RATE", fallback=0.001)
 
         self.host = config["CONNECTION"]["HOST"]
         self.port = int(config["CONNECTION"]["PORT"])
+        # optional: a cache server to use w/o registering, see config.ini
+        self.local_cache_server = config.get("CONNECTION", "CACHE_SERVER", fallback="").strip()
 
         self.seed_urls = config["CRAWLER"]["SEEDURL"].split(",")
         self.time_delay = float(config["CRAWLER"]["POLITENESS"])
+        self.fetch_mode = config.get("CRAWLER", "FETCH_MODE", fallback="threads").strip().lower()
+        assert self.fetch_mode in ("threads", "async"), "FETCH_MODE should be threads or async"
+        self.async_tasks = config.getint("CRAWLER", "ASYNC_TASKS", fallback=16)
+        self.priority = config.get("CRAWLER", "PRIORITY", fallback="depth").strip().lower()
+        assert self.priority in ("depth", "fairness", "score"), "PRIORITY should be depth, fairness or score"
+        self.partitions = config.getint("CRAWLER", "PARTITIONS", fallback=1)
+        assert self.partitions >= 1, "PARTITIONS should be at least 1"
+
+        # optional [RESPONSE_CACHE] section, see config.ini
+        self.response_cache = config.get("RESPONSE_CACHE", "DIRECTORY", fallback="").strip()
+        self.response_cache_size = int(
+            config.getfloat("RESPONSE_CACHE", "MAX_SIZE_MB", fallback=1024) * 2 ** 20)
+        self.response_cache_mode = config.get("RESPONSE_CACHE", "MODE", fallback="readwrite").strip().lower()
+        assert self.response_cache_mode in ("readwrite", "replay"), "MODE should be readwrite or replay"
+
+        # optional [TRAPS] section, see config.ini
+        self.trap_detection = config.getboolean("TRAPS", "ENABLED", fallback=True)
+        self.max_path_depth = config.getint("TRAPS", "MAX_PATH_DEPTH", fallback=10)
+        self.max_repeated_segments = config.getint("TRAPS", "MAX_REPEATED_SEGMENTS", fallback=2)
+        self.max_param_values = config.getint("TRAPS", "MAX_PARAM_VALUES", fallback=50)
+        self.trap_min_samples = config.getint("TRAPS", "MIN_SAMPLES", fallback=20)
+        self.trap_throttle_rate = config.getfloat("TRAPS", "THROTTLE_RATE", fallback=0.5)
+        self.trap_block_rate = config.getfloat("TRAPS", "BLOCK_RATE", fallback=0.8)
+
+        # optional [LOGGING] section, see config.ini
+        self.log_format = config.get("LOGGING", "LOG_FORMAT", fallback="text").strip().lower()
+        assert self.log_format in ("text", "json"), "LOG_FORMAT should be text or json"
+        self.log_buffer = config.getint("LOGGING", "LOG_BUFFER", fallback=100)
+        self.log_sample_rate = config.getfloat("LOGGING", "LOG_SAMPLE_RATE", fallback=1.0)
+
+        # optional [METRICS] section, see config.ini
+        self.metrics_file = config.get("METRICS", "METRICS_FILE", fallback="Logs/metrics.json")
+        self.metrics_interval = config.getfloat("METRICS", "METRICS_INTERVAL", fallback=10.0)
+        self.metrics_port = config.getint("METRICS", "METRICS_PORT", fallback=0)
+        self.profile_stages = {
+            stage.strip() for stage in config.get("METRICS", "PROFILE", fallback="").split(",")
+            if stage.strip()}
 
-        self.cache_server = None
\ No newline at end of file
+        self.cache_server = None
+        if self.local_cache_server:
+            host, port = self.local_cache_server.rsplit(":", 1)
+            self.cache_server = (host, int(port))
\ No newline at end of file
@@ -0,0 +1,125 @@
+import heapq
+import math
+from array import array
+from hashlib import blake2b
+
+
+class ExactCounter(dict):
+    """ Exact word counts ({word: count}). top() uses heapq.nlargest instead of sorting
+        the whole vocabulary.
+    """
+    def add_counts(self, counts: dict):
+        """ Adds {word: count} (e.g. the counts of one page). """
+        get = self.get
+        for word, count in counts.items():
+            self[word] = get(word, 0) + count
+
+    def top(self, k: int) -> list:
+        """ Returns: the k most common (word, count), by count descending (same order as
+            sorted(..., reverse=True)[:k]) """
+        return heapq.nlargest(k, self.items(), key=lambda item: item[1])
+
+    def error_bounds(self) -> dict:
+        return {"mode": "exact", "max_overestimate": 0}
+
+
+class CountMinSketch(object):
+    """ Count-Min Sketch: depth rows of width counters. An estimate is never below the
+        true count and, w probability 1 - e^-depth, at most e / width * total above it.
+    """
+    def __init__(self, width=2 ** 16, depth=4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("q", [0]) * width for _ in range(depth)]
+        self.total = 0
+
+    def _columns(self, word):
+        digest = blake2b(word.encode("utf-8"), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[i * 8:i * 8 + 8], "big") % self.width for i in range(self.depth)]
+
+    def add(self, word, count=1) -> int:
+        """ Adds count & returns the new estimate for word. """
+        self.total += count
+        estimate = None
+        for row, column in zip(self.rows, self._columns(word)):
+            row[column] += count
+            estimate = row[column] if estimate is None else min(estimate, row[column])
+        return estimate
+
+    def estimate(self, word) -> int:
+        return min(row[column] for row, column in zip(self.rows, self._columns(word)))
+
+    def max_overestimate(self) -> float:
+        return math.e / self.width * self.total
+
+
+class ApproxCounter(object):
+    """ Heavy hitters in fixed memory: a Count-Min Sketch for the counts & a Space-Saving
+        table of the `capacity` words w the highest estimates. When the table is full a
+        new word replaces the word w the lowest estimate if its own estimate is higher.
+        Counts are overestimates, see error_bounds().
+        Args:
+            capacity - number of words kept (must be well above the k asked of top())
+            width, depth - Count-Min Sketch size (memory is width * depth counters)
+    """
+    def __init__(self, capacity=10_000, width=2 ** 16, depth=4):
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        self.counts = dict() # monitored word -> estimate
+        self.heap = list() # (estimate, word), lazily updated min-heap over self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add_counts(self, counts: dict):
+        """ Adds {word: count} (e.g. the counts of one page). """
+        for word, count in counts.items():
+            estimate = self.sketch.add(word, count)
+            if word in self.counts:
+                self.counts[word] = estimate
+                continue
+            if len(self.counts) < self.capacity:
+                self.counts[word] = estimate
+                heapq.heappush(self.heap, (estimate, word))
+                continue
+            # table is full: evict the lowest monitored word if this one is now above it
+            while True:
+                low, low_word = self.heap[0]
+                if self.counts[low_word] != low: # stale entry, refresh it
+                    heapq.heapreplace(self.heap, (self.counts[low_word], low_word))
+                    continue
+                break
+            if estimate > low:
+                heapq.heapreplace(self.heap, (estimate, word))
+                del self.counts[low_word]
+                self.counts[word] = estimate
+
+    def get(self, word, default=0):
+        return self.counts.get(word, default)
+
+    def items(self):
+        return self.counts.items()
+
+    def top(self, k: int) -> list:
+        """ Returns: the k most common (word, estimated count), by count descending """
+        return heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
+
+    def error_bounds(self) -> dict:
+        """ Every reported count is >= the true count and, w probability 1 - e^-depth, at
+            most max_overestimate above it.
+        """
+        return {
+            "mode": "approximate",
+            "max_overestimate": self.sketch.max_overestimate(),
+            "confidence": 1 - math.exp(-self.sketch.depth),
+            "total": self.sketch.total,
+        }
+
+
+def make_counter(mode="exact", capacity=10_000, width=2 ** 16, depth=4):
+    """ Builds the word counter for scraper.WORD_COUNTER: "exact" or "approximate". """
+    if mode == "exact":
+        return ExactCounter()
+    if mode == "approximate":
+        return ApproxCounter(capacity, width, depth)
+    raise ValueError(f"Unknown word counter {mode!r}")
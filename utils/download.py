@@ -1,17 +1,45 @@
 import requests
 import cbor
 import time
+import asyncio
 
 from utils.response import Response
+from utils.response_cache import get_response_cache
+
+def cached(url, config):
+    ''' Looks url up in the response cache ([RESPONSE_CACHE] in config.ini).
+        Returns: (cache, resp) - the cache (None if it's off) & the cached Response, an
+            error Response for a miss in replay mode or None if url has to be downloaded
+    '''
+    if not config.response_cache:
+        return None, None
+    cache = get_response_cache(config.response_cache, config.response_cache_size)
+    reply = cache.get(url)
+    if reply is not None:
+        resp = Response(cbor.loads(reply))
+        resp.from_cache = True
+        return cache, resp
+    if config.response_cache_mode == "replay": # never ask the server
+        resp = Response({
+            "error": f"{url} is not in the response cache.", "status": 404, "url": url})
+        resp.from_cache = True # nothing was downloaded either
+        return cache, resp
+    return cache, None
 
 def download(url, config, logger=None):
+    cache, resp = cached(url, config)
+    if resp is not None:
+        return resp
     host, port = config.cache_server
     resp = requests.get(
         f"http://{host}:{port}/",
         params=[("q", f"{url}"), ("u", f"{config.user_agent}")])
     try:
         if resp and resp.content:
-            return Response(cbor.loads(resp.content))
+            response = Response(cbor.loads(resp.content))
+            if cache is not None and response.status == 200: # errors may not last, ask again next time
+                cache.put(url, resp.content)
+            return response
     except (EOFError, ValueError) as e:
         pass
     logger.error(f"Spacetime Response error {resp} with url {url}.")
@@ -19,3 +47,34 @@ def download(url, config, logger=None):
         "error": f"Spacetime Response error {resp} with url {url}.",
         "status": resp.status_code,
         "url": url})
+
+
+async def download_async(url, config, session, logger=None, executor=None):
+    ''' Same as download, but through a pooled aiohttp ClientSession (see
+        crawler/async_worker.py), so the connection to the cache server is kept alive.
+        The response cache's disk & SQLite I/O runs on executor (None: the loop's
+        default one), never on the event loop.
+    '''
+    loop = asyncio.get_running_loop()
+    cache, cached_resp = await loop.run_in_executor(executor, cached, url, config)
+    if cached_resp is not None:
+        return cached_resp
+    host, port = config.cache_server
+    async with session.get(
+            f"http://{host}:{port}/",
+            params=[("q", f"{url}"), ("u", f"{config.user_agent}")]) as resp:
+        content = await resp.read()
+        status = resp.status
+    try:
+        if status < 400 and content:
+            response = Response(cbor.loads(content))
+            if cache is not None and response.status == 200:
+                await loop.run_in_executor(executor, cache.put, url, content)
+            return response
+    except (EOFError, ValueError) as e:
+        pass
+    logger.error(f"Spacetime Response error {status} with url {url}.")
+    return Response({
+        "error": f"Spacetime Response error {status} with url {url}.",
+        "status": status,
+        "url": url})
@@ -0,0 +1,110 @@
+from hashlib import blake2b, sha1
+from collections import Counter
+from threading import Lock
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3 # words per feature
+
+
+def fingerprint(tokens) -> tuple:
+    """ Content fingerprint of a page.
+        Args:
+            tokens - the page's words (Page.tokens)
+        Returns: (checksum, simhash) - sha1 hex of the lowercased text & a 64 bit SimHash
+            over its 3-word shingles
+    """
+    words = [token.lower() for token in tokens]
+    checksum = sha1(" ".join(words).encode("utf-8")).hexdigest()
+
+    # 8 byte hash per shingle (repeated shingles weigh more), all in one bytes object so
+    # the bits can be counted per byte position w Counter instead of bit by bit in Python
+    shingles = [
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))]
+    hashes = b"".join(
+        blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+    ones = [0] * SIMHASH_BITS # number of shingles w each bit set
+    for position in range(8):
+        for value, count in Counter(hashes[position::8]).items():
+            for bit in range(8):
+                if value >> bit & 1:
+                    ones[position * 8 + bit] += count
+    simhash = 0
+    for bit in range(SIMHASH_BITS):
+        if 2 * ones[bit] > len(shingles): # bit set in more than half the shingles
+            simhash |= 1 << bit
+    return checksum, simhash
+
+
+class DuplicateIndex(object):
+    """ Index of page fingerprints: a set of checksums for exact duplicates and a banded
+        LSH index of simhashes for near duplicates. The simhash is cut into
+        max_distance + 1 bands, so by the pigeonhole principle any simhash within
+        max_distance bits of a stored one shares at least one band with it and only
+        pages in the same buckets are compared.
+        Thread safe.
+        Args:
+            threshold - similarity (1 - hamming distance / 64) from which a page is a near
+                duplicate, 1.0 only catches exact duplicates
+    """
+    def __init__(self, threshold=0.9):
+        self.threshold = threshold
+        self.max_distance = int((1 - threshold) * SIMHASH_BITS)
+        band_count = self.max_distance + 1
+        width = SIMHASH_BITS // band_count
+        self.bands = [
+            (i * width, (1 << (width if i < band_count - 1 else SIMHASH_BITS - i * width)) - 1)
+            for i in range(band_count)] # (shift, mask) of each band
+        self.buckets = [dict() for _ in self.bands] # band value -> list of simhashes
+        self.checksums = set()
+        self.lock = Lock()
+        self.checks = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+
+    def _near(self, simhash):
+        for (shift, mask), buckets in zip(self.bands, self.buckets):
+            for other in buckets.get(simhash >> shift & mask, ()):
+                if bin(simhash ^ other).count("1") <= self.max_distance:
+                    return True
+        return False
+
+    def check_and_add(self, checksum, simhash) -> str:
+        """ Looks a page up and adds it if it's new.
+            Returns: "exact", "near" or None (new page)
+        """
+        with self.lock:
+            self.checks += 1
+            if checksum in self.checksums:
+                self.exact_hits += 1
+                return "exact"
+            self.checksums.add(checksum)
+            if self.max_distance and self._near(simhash):
+                self.near_hits += 1
+                return "near"
+            for (shift, mask), buckets in zip(self.bands, self.buckets):
+                buckets.setdefault(simhash >> shift & mask, []).append(simhash)
+            return None
+
+    def add(self, checksum, simhash):
+        """ Adds a page known to be new w/o counting a check, e.g. one restored from the
+            frontier's store after a restart.
+        """
+        with self.lock:
+            if checksum in self.checksums:
+                return
+            self.checksums.add(checksum)
+            for (shift, mask), buckets in zip(self.bands, self.buckets):
+                buckets.setdefault(simhash >> shift & mask, []).append(simhash)
+
+    def report(self) -> dict:
+        """ Returns: dict w the number of pages checked, hits & hit rates """
+        with self.lock:
+            checks = self.checks or 1
+            return {
+                "checked": self.checks,
+                "exact_duplicates": self.exact_hits,
+                "near_duplicates": self.near_hits,
+                "exact_rate": self.exact_hits / checks,
+                "near_rate": self.near_hits / checks,
+            }
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import bisect
+import pstats
+import cProfile
+from contextlib import contextmanager
+from threading import Thread, Lock, Event, local
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# upper bounds (seconds) of the latency histogram buckets: 0.1 ms doubling up to ~105 s
+BUCKETS = [0.0001 * 2 ** i for i in range(21)]
+
+
+class Histogram(object):
+    ''' Latency histogram w fixed log-scale buckets, so recording is O(log buckets) and
+        memory never grows. Percentiles are the upper bound of the bucket they fall in.
+    '''
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1) # last bucket: above BUCKETS[-1]
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        rank, seen = fraction * self.count, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class Metrics(object):
+    ''' Thread safe registry of counters, latency histograms (one per stage) & gauges
+        (callables read at snapshot time). Stages listed in `profile` are also run
+        under cProfile, one profiler per thread, merged when dumped. A thread can only
+        run one profiler at a time, so don't profile two stages that nest.
+    '''
+    def __init__(self):
+        self.lock = Lock()
+        self.started = time.monotonic()
+        self.counters = dict()
+        self.histograms = dict()
+        self.gauges = dict()
+        self.profile = set()
+        self.profilers = dict() # stage -> list of cProfile.Profile (one per thread)
+        self._thread = local()
+        self._last = (self.started, 0) # (time, pages) of the previous snapshot
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.record(seconds)
+
+    def gauge(self, name, read):
+        ''' Registers a callable whose value is read at every snapshot. '''
+        with self.lock:
+            self.gauges[name] = read
+
+    def _profiler(self, stage):
+        profilers = getattr(self._thread, "profilers", None)
+        if profilers is None:
+            profilers = self._thread.profilers = dict()
+        if stage not in profilers:
+            profilers[stage] = cProfile.Profile()
+            with self.lock:
+                self.profilers.setdefault(stage, []).append(profilers[stage])
+        return profilers[stage]
+
+    @contextmanager
+    def timer(self, stage):
+        ''' Times the block into the stage's histogram (& profiles it if asked to). '''
+        profiler = self._profiler(stage) if stage in self.profile else None
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            self.record(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {stage: h.summary() for stage, h in self.histograms.items()}
+            gauges = dict(self.gauges)
+            last_time, last_pages = self._last
+            pages = counters.get("pages", 0)
+            self._last = (now, pages)
+        uptime = now - self.started
+        return {
+            "uptime": uptime,
+            "pages_per_second": pages / uptime if uptime else 0.0,
+            "recent_pages_per_second": (pages - last_pages) / (now - last_time) if now > last_time else 0.0,
+            "counters": counters,
+            "latency": histograms,
+            "gauges": {name: read() for name, read in gauges.items()},
+        }
+
+    def dump_profiles(self, directory):
+        ''' Writes Logs/profile-<stage>.prof (pstats format) for every profiled stage. '''
+        with self.lock:
+            profilers = {stage: list(p) for stage, p in self.profilers.items()}
+        for stage, stage_profilers in profilers.items():
+            merged = pstats.Stats(stage_profilers[0])
+            for profiler in stage_profilers[1:]:
+                merged.add(profiler)
+            merged.dump_stats(os.path.join(directory, f"profile-{stage}.prof"))
+
+
+# the crawler's metrics, shared by every module
+metrics = Metrics()
+
+
+class MetricsReporter(Thread):
+    ''' Writes a metrics snapshot to `path` every `interval` seconds and, if `port` is
+        set, serves the current snapshot as JSON on http://127.0.0.1:<port>/ (any path).
+    '''
+    def __init__(self, path, interval=10.0, port=0, registry=metrics):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stopped = Event()
+        self.server = None
+        if port:
+            source = registry
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = json.dumps(source.snapshot(), indent=2).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                def log_message(self, format, *args):
+                    pass
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+            Thread(target=self.server.serve_forever, daemon=True).start()
+        super().__init__(daemon=True)
+
+    def write(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.registry.snapshot(), file, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        ''' Stops reporting & writes a final snapshot (and the profiles, once every
+            profiled thread is done).
+        '''
+        self.stopped.set()
+        if self.server:
+            self.server.shutdown()
+        self.write()
+        if self.registry.profile:
+            self.registry.dump_profiles(os.path.dirname(self.path) or ".")
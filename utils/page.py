@@ -0,0 +1,238 @@
+import codecs
+import re
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EncodingDetector, UnicodeDammit, EntitySubstitution
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+
+try:
+    import lxml  # optional, only needed for the "lxml" backend
+except ImportError:
+    lxml = None
+
+# tags whose strings BeautifulSoup leaves out of get_text()
+SKIPPED_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+
+# content types worth parsing (a missing header is given the benefit of the doubt)
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# tags & entities for the cheap word estimate (done on bytes, no decoding)
+_TAGS = re.compile(rb"<[a-zA-Z/!?][^>]*>")
+_ENTITIES = re.compile(rb"&#?\w+;")
+# utf-8 bytes of the whitespace str.split() splits on that bytes.split() doesn't
+# (no-break space, ideographic space, ...)
+_OTHER_SPACES = re.compile(b"|".join(
+    [rb"[\x1c-\x1f]"] + [re.escape(chr(c).encode("utf-8")) for c in range(0x80, 0x3001) if chr(c).isspace()]))
+
+STREAM_CHUNK_SIZE = 64 * 1024 # bytes fed to the streaming parser at a time
+
+
+class Page(object):
+    """ Result of parsing one response body a single time.
+        Attributes:
+            text - visible text of the page, strings joined by a space
+            tokens - the text split on whitespace
+            word_count - number of whitespace separated words
+            hrefs - raw href values of every <a> tag, in document order
+    """
+    def __init__(self, text, hrefs):
+        self.text = text
+        self.tokens = text.split()
+        self.word_count = len(self.tokens)
+        self.hrefs = hrefs
+
+
+class _StreamParser(HTMLParser):
+    """ Streaming parser that collects the same strings and hrefs as BeautifulSoup
+        (with html.parser) without building a tree. Character & entity references are
+        resolved the way bs4's html.parser builder does (an unknown &name; stays "&name").
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.strings = []
+        self.hrefs = []
+        self._buffer = []
+        self._skip_depth = 0
+
+    def _flush(self):
+        if self._buffer:
+            if not self._skip_depth:
+                self.strings.append("".join(self._buffer))
+            self._buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIPPED_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag == "a":
+            self._add_href(attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        if tag == "a":
+            self._add_href(attrs)
+
+    def _add_href(self, attrs):
+        attrs = dict(attrs) # like BeautifulSoup: the last of duplicate attributes wins
+        if "href" in attrs:
+            self.hrefs.append(attrs["href"] or "") # <a href> is ""
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIPPED_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        self._buffer.append(data)
+
+    def handle_charref(self, name):
+        dereferenced, _, extra_data = \
+            BeautifulSoupHTMLParser._dereference_numeric_character_reference(name)
+        if dereferenced is not None:
+            self._buffer.append(dereferenced)
+        if extra_data is not None:
+            self._buffer.append(extra_data)
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self._buffer.append(character if character is not None else f"&{name}")
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.startswith("CDATA[") and not self._skip_depth:
+            self.strings.append(data[len("CDATA["):])
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _parse_soup(content, builder):
+    html = BeautifulSoup(content, builder, from_encoding="utf-8") # encoding to handle char encoding errors
+    text = html.get_text(separator=" ")
+    hrefs = [a.get("href") for a in html.find_all("a") if a.get("href") is not None]
+    return Page(text, hrefs)
+
+
+def _codec(encoding):
+    """ Python codec of an encoding name, looked up like bs4's UnicodeDammit.find_codec. """
+    for name in (UnicodeDammit.CHARSET_ALIASES.get(encoding, encoding),
+                 encoding.replace("-", ""), encoding.replace("-", "_")):
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return None
+
+
+def _decodes(content, codec):
+    decoder = codecs.getincrementaldecoder(codec)()
+    try:
+        for start in range(0, len(content), STREAM_CHUNK_SIZE):
+            decoder.decode(content[start:start + STREAM_CHUNK_SIZE])
+        decoder.decode(b"", final=True)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def detect_encoding(content):
+    """ Picks the encoding BeautifulSoup(content, from_encoding="utf-8") would decode
+        content with, the way its UnicodeDammit does: the first of utf-8, the byte order
+        mark's, the <meta> declared one, ..., windows-1252 that decodes all of it (tried
+        chunk by chunk, w/o keeping the decoded text), else the first that does w
+        replacement characters.
+        Args:
+            content - raw html (bytes)
+        Returns: (content w/o its byte order mark, codec, errors for decoding)
+    """
+    detector = EncodingDetector(content, known_definite_encodings=["utf-8"], is_html=True)
+    markup = detector.markup
+    codecs_tried = list()
+    for encoding in detector.encodings:
+        codec = _codec(encoding)
+        if codec is None or codec in codecs_tried:
+            continue
+        codecs_tried.append(codec)
+        if _decodes(markup, codec):
+            return markup, codec, "strict"
+    for codec in codecs_tried:
+        if codec != "ascii":
+            return markup, codec, "replace"
+    return markup, "utf-8", "replace"
+
+
+def _parse_stream(content):
+    # decode & feed in chunks so no full decoded copy of the body is ever held
+    parser = _StreamParser()
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    content, codec, errors = detect_encoding(content)
+    decoder = codecs.getincrementaldecoder(codec)(errors=errors)
+    for start in range(0, len(content), STREAM_CHUNK_SIZE):
+        parser.feed(decoder.decode(content[start:start + STREAM_CHUNK_SIZE]))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return Page(" ".join(parser.strings), parser.hrefs)
+
+
+BACKENDS = ("html.parser", "lxml", "stream")
+
+
+def parse_page(content, backend="html.parser") -> Page:
+    """ Parses an HTML body once and returns its text, tokens, word count and hrefs.
+        Args:
+            content - raw html (bytes or str), usually resp.raw_response.content
+            backend - "html.parser" (BeautifulSoup, reference output), "stream" (HTMLParser
+                subclass, same output w/o building a tree, same encoding detection too, see
+                detect_encoding & utils/test_page.py) or "lxml" (BeautifulSoup on lxml,
+                fastest but can differ on malformed markup; falls back to html.parser if
+                lxml isn't installed)
+        Returns: a Page
+    """
+    if backend == "stream":
+        return _parse_stream(content)
+    if backend == "lxml" and lxml is not None:
+        return _parse_soup(content, "lxml")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r}")
+    return _parse_soup(content, "html.parser")
+
+
+def is_html_content_type(headers) -> bool:
+    """ Checks the Content-Type header of a raw response before anything is parsed.
+        Args:
+            headers - raw_response.headers (or None)
+        Returns: bool - False only if the header is present and not an html/xhtml type
+    """
+    content_type = headers.get("Content-Type") if headers else None
+    if not content_type:
+        return True
+    return content_type.strip().lower().startswith(HTML_CONTENT_TYPES)
+
+
+def estimate_word_count(content) -> int:
+    """ Cheap estimate of how many words get_text() would find, without parsing.
+        Tags & entities are replaced by a space, text is split on the same (unicode)
+        whitespace as str.split() & every entity counts as a possible extra word (it may
+        be a word of its own), so the estimate errs on the high side (script/style text
+        is counted too).
+        Args:
+            content - raw html (bytes or str)
+        Returns: int - the estimated word count
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    stripped = _TAGS.sub(b" ", content)
+    stripped, entities = _ENTITIES.subn(b" ", stripped)
+    return len(_OTHER_SPACES.sub(b" ", stripped).split()) + entities
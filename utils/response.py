@@ -5,10 +5,40 @@ class Response(object):
         self.url = resp_dict["url"]
         self.status = resp_dict["status"]
         self.error = resp_dict["error"] if "error" in resp_dict else None
-        try:
-            self.raw_response = (
-                pickle.loads(resp_dict["response"])
-                if "response" in resp_dict else
-                None)
-        except TypeError:
-            self.raw_response = None
+        self.from_cache = False # set by utils.download when it came from the response cache
+        # the raw response is only unpickled when raw_response is first read, so pages
+        # that are rejected by their status never pay for it
+        self._pickled = resp_dict.get("response")
+        self._raw_response = None
+
+    @property
+    def raw_response(self):
+        if self._pickled is not None:
+            try:
+                self._raw_response = pickle.loads(self._pickled)
+            except TypeError:
+                self._raw_response = None
+            self._pickled = None
+        return self._raw_response
+
+    @raw_response.setter
+    def raw_response(self, raw_response):
+        self._pickled = None
+        self._raw_response = raw_response
+
+    def stripped(self):
+        ''' Copy whose raw_response only keeps content & headers (see RawResponse), cheap
+            to pickle to a parse process.
+        '''
+        copy = Response({"url": self.url, "status": self.status, "error": self.error})
+        if self.raw_response is not None:
+            copy.raw_response = RawResponse(
+                self.raw_response.content, dict(getattr(self.raw_response, "headers", None) or {}))
+        return copy
+
+
+class RawResponse(object):
+    ''' The parts of a requests.Response that the scraper reads. '''
+    def __init__(self, content, headers):
+        self.content = content
+        self.headers = headers
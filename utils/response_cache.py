@@ -0,0 +1,160 @@
+import os
+import time
+import zlib
+import sqlite3
+from hashlib import sha256
+from threading import Lock
+
+from utils import get_urlhash
+from utils.metrics import metrics
+
+_cache = None
+_cache_lock = Lock()
+
+
+class ResponseCache(object):
+    """ On-disk cache of cache server replies (the CBOR bytes utils.download gets), so a
+        recrawl or replay run can re-process pages w/o downloading them again. Only
+        status 200 replies are put in it (see utils/download.py), errors are asked again.
+
+        Replies are zlib compressed & stored content addressed: a blob's file name is the
+        sha256 of its data, so identical replies (mirrors, exact duplicates) are stored
+        once. An SQLite index maps urlhash -> blob & the time the url was last used.
+        Once the blobs take more than max_bytes, the least recently used urls are
+        dropped, and a blob w/o urls left is deleted. The blobs' total size is kept in
+        the index too & every put is one write transaction, so processes sharing the
+        directory (PARTITIONS > 1) see each other's blobs & evict down to one budget.
+        Thread safe.
+        Args:
+            directory - where the blobs & the index go (created if missing)
+            max_bytes - size budget of the blobs (compressed)
+    """
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = Lock()
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        self.db = sqlite3.connect(
+            os.path.join(directory, "index.db"), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "urlhash TEXT PRIMARY KEY, blob TEXT NOT NULL, size INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_blob ON entries (blob)")
+        # one row: the size of the blobs (computed once for an index written before it was kept)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)")
+        self.db.execute(
+            "INSERT OR IGNORE INTO totals (id, size) SELECT 0, COALESCE(SUM(size), 0) "
+            "FROM (SELECT DISTINCT blob, size FROM entries)")
+
+    @property
+    def size(self):
+        """ Size of the blobs (compressed), of every process using the directory. """
+        return self.db.execute("SELECT size FROM totals").fetchone()[0]
+
+    def _add_size(self, size):
+        self.db.execute("UPDATE totals SET size = size + ?", (size,))
+
+    def _path(self, blob):
+        return os.path.join(self.directory, "blobs", blob[:2], blob)
+
+    def get(self, url):
+        """ Returns: the cached reply for url (CBOR bytes) or None """
+        urlhash = get_urlhash(url)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT blob FROM entries WHERE urlhash = ?", (urlhash,)).fetchone()
+            if row is None:
+                metrics.count("response_cache_misses")
+                return None
+            try:
+                with open(self._path(row[0]), "rb") as file:
+                    data = file.read()
+            except FileNotFoundError: # deleted behind our back, forget it
+                self.db.execute("DELETE FROM entries WHERE urlhash = ?", (urlhash,))
+                metrics.count("response_cache_misses")
+                return None
+            self.db.execute(
+                "UPDATE entries SET last_used = ? WHERE urlhash = ?", (time.time(), urlhash))
+        metrics.count("response_cache_hits")
+        return zlib.decompress(data)
+
+    def put(self, url, reply):
+        """ Caches a reply (CBOR bytes) for url, then evicts down to max_bytes. """
+        data = zlib.compress(reply)
+        blob = sha256(data).hexdigest()
+        path = self._path(blob)
+        with self.lock, self.db:
+            # one writer at a time, other processes sharing the directory included, so a
+            # blob can't be deleted by one while another adds a url to it
+            self.db.execute("BEGIN IMMEDIATE")
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as file:
+                    file.write(data)
+                os.replace(tmp_path, path) # readers never see half a blob
+                self._add_size(len(data))
+            previous = self.db.execute(
+                "SELECT blob, size FROM entries WHERE urlhash = ?", (get_urlhash(url),)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (urlhash, blob, size, last_used) VALUES (?, ?, ?, ?)",
+                (get_urlhash(url), blob, len(data), time.time()))
+            if previous and previous[0] != blob:
+                self._release_blob(*previous)
+            self._evict()
+
+    def _release_blob(self, blob, size):
+        """ Deletes a blob once no url uses it (call w lock held). """
+        if self.db.execute("SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (blob,)).fetchone():
+            return
+        try:
+            os.remove(self._path(blob))
+        except FileNotFoundError:
+            pass
+        self._add_size(-size)
+
+    def _evict(self):
+        """ Drops the least recently used urls until the blobs fit in max_bytes (call w
+            lock held, in put's transaction).
+        """
+        while self.size > self.max_bytes:
+            rows = self.db.execute(
+                "SELECT urlhash, blob, size FROM entries ORDER BY last_used LIMIT 100").fetchall()
+            if not rows:
+                break
+            for urlhash, blob, size in rows:
+                self.db.execute("DELETE FROM entries WHERE urlhash = ?", (urlhash,))
+                self._release_blob(blob, size)
+                metrics.count("response_cache_evictions")
+                if self.size <= self.max_bytes:
+                    break
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def get_response_cache(directory, max_bytes):
+    """ The response cache shared by all workers (opened on first use). """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(directory, max_bytes)
+        return _cache
+
+
+def close_response_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
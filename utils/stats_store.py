@@ -0,0 +1,117 @@
+import os
+import gzip
+import json
+import zlib
+
+# first bytes of every gzip member (magic number & deflate method)
+GZIP_MAGIC = b"\x1f\x8b\x08"
+
+
+def _compress(record):
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    return gzip.compress(line.encode("utf-8"))
+
+
+def append_record(path, record: dict):
+    """ Appends one record to a stats log. Every record is its own gzip member holding
+        one JSON line, and concatenated gzip members are a valid gzip file, so the log
+        is compressed & append-only: nothing written before is ever rewritten.
+        Args:
+            path - the stats log (created if missing)
+            record - JSON serializable dict
+    """
+    with open(path, "ab") as file:
+        file.write(_compress(record))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _members(file, chunk_size=1 << 20):
+    """ Yields the data of every complete gzip member of file, read chunk_size bytes at a
+        time. Every chunk goes through the member's decompressor once; its raw bytes are
+        only kept to resync on failure. A member that is cut off or damaged (a crash while
+        appending, w records appended after it by the next run) is skipped by resyncing
+        at the next gzip header, so the records after it are still read.
+    """
+    buffer, eof = b"", False
+    while True:
+        if len(buffer) < len(GZIP_MAGIC) and not eof:
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if not buffer:
+            return
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) # gzip format
+        raw, data, chunk, complete = [buffer], [], buffer, False
+        while True:
+            try:
+                data.append(decompressor.decompress(chunk))
+            except zlib.error: # damaged
+                break
+            if decompressor.eof:
+                complete = True
+                break
+            if eof: # cut off
+                break
+            chunk = file.read(chunk_size) # the member goes on past the chunk
+            eof = not chunk
+            raw.append(chunk)
+        if complete:
+            yield b"".join(data)
+            buffer = decompressor.unused_data
+        else: # cut off or damaged: skip to the next member
+            buffer = b"".join(raw)
+            start = buffer.find(GZIP_MAGIC, 1)
+            if start != -1:
+                buffer = buffer[start:]
+            else: # keep a tail that may be the start of a header split by the chunk
+                buffer = b"" if eof else buffer[-(len(GZIP_MAGIC) - 1):]
+
+
+def iter_records(*paths):
+    """ Streams the records of one or more stats logs, one at a time, so a log never
+        has to be read into memory whole. A record cut off by a crash is skipped, as are
+        damaged ones, the records after them are still read.
+        Args:
+            paths - stats logs, read in order (missing ones are skipped)
+        Yields: dict per record
+    """
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as file:
+            for data in _members(file):
+                for line in data.decode("utf-8", errors="replace").splitlines():
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+
+def write_records(path, records):
+    """ Writes a new stats log, replacing the old one only once it's complete.
+        Args:
+            path - the stats log
+            records - JSON serializable dicts
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file: # empty (or emptied), even if there are no records
+        for record in records:
+            file.write(_compress(record))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def compact(paths, out_path, combine):
+    """ Merges stats logs (e.g. from several runs or processes) into one log.
+        Args:
+            paths - stats logs to merge
+            out_path - log to write (replaced if it exists)
+            combine - function turning an iterable of records into the merged records
+                (an iterable of small records, so the log can still be read in pieces)
+    """
+    write_records(out_path, combine(iter_records(*paths)))
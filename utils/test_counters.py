@@ -0,0 +1,61 @@
+import random
+from collections import Counter
+
+import pytest
+
+from utils.counters import ExactCounter, CountMinSketch, ApproxCounter, make_counter
+
+
+def zipf_pages(pages=200, seed=0):
+    ''' {word: count} per page, w Zipf-like word frequencies like real text. '''
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(2000)]
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    return [Counter(rng.choices(vocabulary, weights, k=300)) for _ in range(pages)]
+
+
+def test_exact_counter_adds_and_ranks():
+    counter = ExactCounter()
+    counter.add_counts({"a": 2, "b": 5})
+    counter.add_counts({"a": 4, "c": 1})
+    assert counter == {"a": 6, "b": 5, "c": 1}
+    assert counter.top(2) == [("a", 6), ("b", 5)]
+    assert counter.error_bounds()["max_overestimate"] == 0
+
+
+def test_exact_top_matches_sorting():
+    counter = ExactCounter()
+    for page in zipf_pages():
+        counter.add_counts(page)
+    assert counter.top(50) == sorted(counter.items(), key=lambda item: item[1], reverse=True)[:50]
+
+
+def test_sketch_never_underestimates():
+    sketch = CountMinSketch(width=64, depth=4) # small, so columns collide
+    truth = Counter()
+    for page in zipf_pages(50):
+        for word, count in page.items():
+            sketch.add(word, count)
+            truth[word] += count
+    assert sketch.total == sum(truth.values())
+    for word, count in truth.items():
+        assert count <= sketch.estimate(word)
+
+
+def test_approx_counter_finds_the_heavy_hitters():
+    exact, approx = ExactCounter(), ApproxCounter(capacity=200, width=2 ** 12)
+    for page in zipf_pages():
+        exact.add_counts(page)
+        approx.add_counts(page)
+    assert len(approx) == 200
+    assert [word for word, _ in approx.top(20)] == [word for word, _ in exact.top(20)]
+    bound = approx.error_bounds()["max_overestimate"]
+    for word, estimate in approx.top(50):
+        assert exact[word] <= estimate <= exact[word] + bound
+
+
+def test_make_counter():
+    assert isinstance(make_counter("exact"), ExactCounter)
+    assert make_counter("approximate", capacity=10).capacity == 10
+    with pytest.raises(ValueError):
+        make_counter("other")
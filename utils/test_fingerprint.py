@@ -0,0 +1,59 @@
+import random
+
+from utils.fingerprint import fingerprint, DuplicateIndex
+
+
+def words(seed, count=300):
+    rng = random.Random(seed)
+    return ["".join(rng.choice("abcdefghij") for _ in range(5)) for _ in range(count)]
+
+
+def test_fingerprint_ignores_case():
+    tokens = words(1)
+    assert fingerprint(tokens) == fingerprint([token.upper() for token in tokens])
+
+
+def test_simhash_of_a_small_edit_is_close():
+    tokens = words(1)
+    edited = tokens[:150] + ["changed"] + tokens[151:]
+    (checksum, simhash), (other_checksum, other_simhash) = fingerprint(tokens), fingerprint(edited)
+    assert checksum != other_checksum
+    assert bin(simhash ^ other_simhash).count("1") <= 6
+    assert bin(simhash ^ fingerprint(words(2))[1]).count("1") > 6
+
+
+def test_exact_near_and_new_pages():
+    index = DuplicateIndex(0.9)
+    tokens = words(1)
+    assert index.check_and_add(*fingerprint(tokens)) is None
+    assert index.check_and_add(*fingerprint(tokens)) == "exact"
+    assert index.check_and_add(*fingerprint(tokens[:150] + ["changed"] + tokens[151:])) == "near"
+    assert index.check_and_add(*fingerprint(words(2))) is None
+    report = index.report()
+    assert (report["checked"], report["exact_duplicates"], report["near_duplicates"]) == (4, 1, 1)
+    assert report["exact_rate"] == 0.25
+
+
+def test_near_duplicates_within_the_distance_only():
+    index = DuplicateIndex(0.9) # up to 6 of 64 bits
+    index.check_and_add("a", 0)
+    assert index.check_and_add("b", 0b111111) == "near"
+    assert index.check_and_add("c", 0b1111111) is None
+
+
+def test_threshold_1_only_catches_exact_duplicates():
+    index = DuplicateIndex(1.0)
+    index.check_and_add("a", 0)
+    assert index.check_and_add("b", 1) is None
+    assert index.check_and_add("a", 1) == "exact"
+
+
+def test_restored_pages_are_found_but_not_counted():
+    index = DuplicateIndex(0.9)
+    checksum, simhash = fingerprint(words(1))
+    index.add(checksum, simhash)
+    index.add(checksum, simhash) # restoring twice doesn't duplicate the buckets
+    assert index.report()["checked"] == 0
+    assert index.check_and_add(checksum, simhash) == "exact"
+    assert index.check_and_add("other", simhash ^ 1) == "near"
+    assert sum(len(bucket) for buckets in index.buckets for bucket in buckets.values()) == len(index.bands)
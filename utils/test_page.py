@@ -0,0 +1,50 @@
+import pytest
+
+import scraper
+from utils.page import parse_page, estimate_word_count, detect_encoding
+from utils.response import Response, RawResponse
+
+
+def html_response(content):
+    resp = Response({"url": "https://www.ics.uci.edu/a", "status": 200})
+    resp.raw_response = RawResponse(content, {"Content-Type": "text/html"})
+    return resp
+
+
+def test_estimate_ignores_tags():
+    content = b"<html><body>" + b"<div><span>x</span></div>" * 40 + b"</body></html>"
+    assert estimate_word_count(content) == 40
+    assert estimate_word_count(b"<p>caf&eacute; &amp; tea</p>") == 4 # each entity may be a word
+
+
+def test_tag_heavy_page_is_rejected_before_parsing(monkeypatch):
+    def parse_page(content, backend):
+        raise AssertionError("parsed")
+    monkeypatch.setattr(scraper, "parse_page", parse_page)
+    content = (b"<html><body><table>" + b"<tr><td><a href='/x'>x</a></td></tr>" * 30
+               + b"</table></body></html>")
+    assert scraper.process_page("https://www.ics.uci.edu/a", html_response(content)) == ([], None)
+
+
+PAGES = [
+    "café – naïve".encode("cp1252"), # no declared encoding, not utf-8
+    b'<meta charset="iso-8859-1"><p>caf\xe9</p>',
+    b'<meta http-equiv="Content-Type" content="text/html; charset=koi8-r"><p>\xc1\xc2</p>',
+    "﻿<p>café</p>".encode("utf-8"),
+    "﻿<p>café</p>".encode("utf-16"),
+    b"<p>caf\xc3\xa9 \xff broken</p>", # decodes with replacement characters only
+    b"<p>&unknown; &amp &eacute; &#150; &#x2014; &#0; &#xD800; &#99999999;</p>",
+    b"<a href>empty</a><a>none</a><a href=''>blank</a><a href='/1' href='/2'>dup</a><a href=/3 />",
+    b"<p>a<!-- c --><script>s &amp;</script><style>t</style>b<![CDATA[c]]></p>",
+]
+
+
+@pytest.mark.parametrize("content", PAGES)
+def test_stream_matches_beautifulsoup(content):
+    expected, page = parse_page(content, "html.parser"), parse_page(content, "stream")
+    assert (page.text, page.hrefs) == (expected.text, expected.hrefs)
+
+
+def test_detect_encoding_strips_the_bom():
+    assert detect_encoding(b"\xef\xbb\xbf<p>x</p>") == (b"<p>x</p>", "utf-8", "strict")
+    assert detect_encoding("<p>café</p>".encode("utf-16"))[1] == "utf-16-le"
@@ -0,0 +1,89 @@
+import os
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+
+from utils import response_cache
+from utils.response_cache import ResponseCache, close_response_cache
+from utils.download import cached
+
+REPLY = 1000 # bytes of random data, ~1011 compressed
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    ''' time.time() that ticks on every call, so last_used never ties. '''
+    ticks = count()
+    monkeypatch.setattr(response_cache.time, "time", lambda: float(next(ticks)))
+
+
+def blobs(directory):
+    return sorted(name for _, _, names in os.walk(os.path.join(directory, "blobs")) for name in names)
+
+
+def test_least_recently_used_urls_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=int(3.5 * REPLY))
+    replies = {url: os.urandom(REPLY) for url in ("https://a.ics.uci.edu/1", "https://a.ics.uci.edu/2",
+                                                  "https://a.ics.uci.edu/3", "https://a.ics.uci.edu/4")}
+    urls = list(replies)
+    for url in urls[:3]:
+        cache.put(url, replies[url])
+    assert cache.get(urls[0]) == replies[urls[0]] # 2 is the least recently used now
+    cache.put(urls[3], replies[urls[3]])
+    assert cache.get(urls[1]) is None
+    assert [cache.get(url) for url in (urls[0], urls[2], urls[3])] == [replies[url] for url in (urls[0], urls[2], urls[3])]
+    assert len(cache) == 3 and len(blobs(str(tmp_path))) == 3
+    cache.close()
+
+
+def test_shared_blob_is_kept_while_a_url_uses_it(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    mirror = os.urandom(REPLY)
+    cache.put("https://a.ics.uci.edu/1", mirror)
+    cache.put("https://b.ics.uci.edu/1", mirror)
+    assert len(blobs(str(tmp_path))) == 1
+    size = cache.size
+    cache.put("https://a.ics.uci.edu/1", os.urandom(REPLY)) # changed: the mirror keeps the blob
+    assert cache.get("https://b.ics.uci.edu/1") == mirror
+    assert len(blobs(str(tmp_path))) == 2
+    cache.put("https://b.ics.uci.edu/1", os.urandom(REPLY)) # no url left: deleted
+    assert len(blobs(str(tmp_path))) == 2
+    assert cache.size == 2 * size
+    cache.close()
+
+
+def test_size_counts_every_blob_once(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for i in range(3):
+        cache.put(f"https://a.ics.uci.edu/{i}", os.urandom(REPLY))
+    cache.put("https://a.ics.uci.edu/copy", cache.get("https://a.ics.uci.edu/0"))
+    on_disk = sum(os.path.getsize(os.path.join(root, name))
+                  for root, _, names in os.walk(str(tmp_path / "blobs")) for name in names)
+    assert cache.size == on_disk
+    cache.close()
+    assert ResponseCache(str(tmp_path)).size == on_disk
+
+
+def test_processes_sharing_the_directory_keep_one_budget(tmp_path):
+    first = ResponseCache(str(tmp_path), max_bytes=int(2.5 * REPLY))
+    second = ResponseCache(str(tmp_path), max_bytes=int(2.5 * REPLY)) # e.g. another partition
+    first.put("https://a.ics.uci.edu/1", os.urandom(REPLY))
+    first.put("https://a.ics.uci.edu/2", os.urandom(REPLY))
+    second.put("https://b.ics.uci.edu/1", os.urandom(REPLY)) # over budget counting first's blobs
+    assert first.get("https://a.ics.uci.edu/1") is None
+    assert len(blobs(str(tmp_path))) == 2 and first.size == second.size <= 2.5 * REPLY
+    first.close()
+    second.close()
+
+
+def test_replay_miss_is_an_error_response(tmp_path):
+    config = SimpleNamespace(
+        response_cache=str(tmp_path), response_cache_size=1 << 20, response_cache_mode="replay")
+    try:
+        cache, resp = cached("https://a.ics.uci.edu/1", config)
+        assert (resp.status, resp.from_cache, resp.raw_response) == (404, True, None)
+        config.response_cache_mode = "readwrite"
+        assert cached("https://a.ics.uci.edu/1", config) == (cache, None) # to be downloaded
+    finally:
+        close_response_cache()
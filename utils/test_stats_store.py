@@ -0,0 +1,113 @@
+import io
+import gzip
+
+import pytest
+
+import scraper
+from utils.stats_store import append_record, iter_records, write_records, compact, _members
+
+
+def cut_off_log(path):
+    ''' Log of a crawl that crashed while appending b, then appended c & d on resume. '''
+    append_record(path, {"a": 1})
+    data = gzip.compress(b'{"b":2}\n')
+    with open(path, "ab") as file:
+        file.write(data[:len(data) // 2])
+    append_record(path, {"c": 3})
+    append_record(path, {"d": 4})
+
+
+def test_records_are_read_in_order(tmp_path):
+    path = str(tmp_path / "stats.log.gz")
+    for i in range(5):
+        append_record(path, {"i": i})
+    assert list(iter_records(path)) == [{"i": i} for i in range(5)]
+
+
+def test_missing_log_is_skipped(tmp_path):
+    path = str(tmp_path / "stats.log.gz")
+    append_record(path, {"a": 1})
+    assert list(iter_records(str(tmp_path / "missing.log.gz"), path)) == [{"a": 1}]
+
+
+def test_records_after_a_cut_off_one_are_read(tmp_path):
+    path = str(tmp_path / "stats.log.gz")
+    cut_off_log(path)
+    assert list(iter_records(path)) == [{"a": 1}, {"c": 3}, {"d": 4}]
+
+
+def test_cut_off_last_record_is_skipped(tmp_path):
+    path = str(tmp_path / "stats.log.gz")
+    append_record(path, {"a": 1})
+    data = gzip.compress(b'{"b":2}\n')
+    with open(path, "ab") as file:
+        file.write(data[:-3])
+    assert list(iter_records(path)) == [{"a": 1}]
+
+
+def test_damaged_record_is_skipped(tmp_path):
+    path = str(tmp_path / "stats.log.gz")
+    append_record(path, {"a": 1})
+    data = bytearray(gzip.compress(b'{"b":2}\n'))
+    data[12] ^= 0xFF # inside the compressed data
+    with open(path, "ab") as file:
+        file.write(bytes(data))
+    append_record(path, {"c": 3})
+    assert list(iter_records(path)) == [{"a": 1}, {"c": 3}]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 17, 1 << 20])
+def test_members_across_chunk_boundaries(tmp_path, chunk_size):
+    path = str(tmp_path / "stats.log.gz")
+    cut_off_log(path)
+    with open(path, "rb") as file:
+        members = list(_members(io.BytesIO(file.read()), chunk_size))
+    assert members == [b'{"a":1}\n', b'{"c":3}\n', b'{"d":4}\n']
+
+
+def test_write_records_replaces_the_log(tmp_path):
+    path = str(tmp_path / "stats.log.gz")
+    cut_off_log(path)
+    write_records(path, [{"x": 1}])
+    assert list(iter_records(path)) == [{"x": 1}]
+    write_records(path, [])
+    assert list(iter_records(path)) == []
+
+
+def test_compact_merges_logs(tmp_path):
+    paths = [str(tmp_path / "a.log.gz"), str(tmp_path / "b.log.gz")]
+    append_record(paths[0], {"n": 1})
+    append_record(paths[0], {"n": 2})
+    cut_off_log(paths[1])
+    out_path = str(tmp_path / "merged.log.gz")
+    compact(paths, out_path, lambda records: [{"n": len(list(records))}])
+    assert list(iter_records(out_path)) == [{"n": 5}]
+
+
+def test_member_bigger_than_the_chunk(tmp_path):
+    path = str(tmp_path / "stats.log.gz")
+    record = {"urls": [f"https://a.ics.uci.edu/{i}" for i in range(5000)]}
+    append_record(path, record)
+    cut_off_log(path)
+    with open(path, "rb") as file:
+        members = list(_members(io.BytesIO(file.read()), 64))
+    assert len(members) == 4 and members[1:] == [b'{"a":1}\n', b'{"c":3}\n', b'{"d":4}\n']
+
+
+def test_merged_stats_are_written_in_small_records(tmp_path, monkeypatch):
+    paths = [str(tmp_path / "a.log.gz"), str(tmp_path / "b.log.gz")]
+    for i, path in enumerate(paths):
+        write_records(path, [{
+            "unique_pgs": [f"https://a.ics.uci.edu/{i}/{n}" for n in range(25)],
+            "longest_page": [f"https://a.ics.uci.edu/{i}/0", 100 + i],
+            "word_counts": {f"w{n}": 1 for n in range(i, 15 + i)}}])
+    out_path = str(tmp_path / "merged.log.gz")
+    monkeypatch.setattr(scraper, "STATS_RECORD_SIZE", 10)
+    scraper.merge_stats_files(paths, out_path)
+    records = list(iter_records(out_path))
+    assert len(records) == 1 + 5 + 2
+    assert all(len(record.get("unique_pgs", record.get("word_counts", ()))) <= 10 for record in records)
+    merged = scraper.combine_deltas(records)
+    assert len(merged["unique_pgs"]) == 50
+    assert merged["longest_page"] == ("https://a.ics.uci.edu/1/0", 101)
+    assert merged["word_counts"] == {f"w{n}": 1 + (0 < n < 15) for n in range(16)}
@@ -0,0 +1,28 @@
+import scraper
+
+URLS = [
+    "https://www.ics.uci.edu/about",
+    "https://WWW.ICS.UCI.EDU:443/About/",
+    "https://user:pw@www.cs.uci.edu/a",
+    "http://ics.uci.edu",
+    "ftp://www.ics.uci.edu/a",
+    "https://www.example.com/a",
+    "https://notics.uci.edu/a",
+    "https://grape.ics.uci.edu/wiki/a",
+    "https://www.ics.uci.edu/paper.PDF",
+    "https://www.ics.uci.edu/a;jsessionid=1.pdf", # the ;params aren't part of the path
+    "https://www.ics.uci.edu/a.pdf;v=1",
+    "https://www.ics.uci.edu/a;x/http/b",
+    "https://www.ics.uci.edu/events/2024",
+    "https://www.ics.uci.edu/a?do=edit",
+    "https://www.ics.uci.edu/a?q=1&b=2&c=3&d=4&e=5",
+    "https://www.ics.uci.edu/a?x=1?y=2",
+    "https://www.ics.uci.edu/" + "a" * 200,
+    "https://www.ics.uci.edu/a/http://b",
+    "https://",
+]
+
+
+def test_batch_matches_single_checks():
+    assert scraper.is_valid_many(URLS) == [url for url in URLS if scraper.is_valid(url)]
+    assert scraper.is_valid_many(URLS * 2) == [url for url in URLS * 2 if scraper.is_valid(url)]
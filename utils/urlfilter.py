@@ -0,0 +1,113 @@
+import re
+from hashlib import sha256
+from urllib.parse import urlparse, urlsplit
+
+
+class UrlFilter(object):
+    """ Precompiled URL rules. Everything is built once in __init__, so each check is
+        one urlparse, a hashed lookup per hostname suffix & two regex searches.
+        Args:
+            allowed_domains - domains (and their subdomains) that may be crawled
+            extensions - file extensions that are never crawled
+            path_traps - regexes matched (search) against the lowercased path
+            query_traps - substrings/regexes matched against the lowercased query
+            host_traps - substrings that reject a hostname
+            max_url_length - longer URLs are rejected
+            max_questions, max_ampersands - URLs with more '?'/'&' are rejected
+    """
+    def __init__(self, allowed_domains, extensions, path_traps, query_traps,
+                 host_traps=(), max_url_length=200, max_questions=1, max_ampersands=4):
+        self.allowed_domains = frozenset(domain.lower() for domain in allowed_domains)
+        self.host_traps = tuple(host_traps)
+        self.max_url_length = max_url_length
+        self.max_questions = max_questions
+        self.max_ampersands = max_ampersands
+
+        # one regex for bad file extensions + path traps, one for query traps
+        self._path_re = re.compile(
+            r"\.(?:" + "|".join(extensions) + r")$|" + "|".join(
+                f"(?:{trap})" for trap in path_traps))
+        self._query_re = re.compile("|".join(f"(?:{trap})" for trap in query_traps))
+
+        # identifies this rule set, changes whenever a rule does
+        self.version = sha256(repr((
+            sorted(self.allowed_domains), self._path_re.pattern, self._query_re.pattern,
+            self.host_traps, max_url_length, max_questions, max_ampersands)
+        ).encode("utf-8")).hexdigest()[:16]
+
+    def _allowed_host(self, hostname: str) -> bool:
+        # hostname itself or any ".suffix" of it must be an allowed domain
+        if hostname in self.allowed_domains:
+            return True
+        dot = hostname.find(".")
+        while dot != -1:
+            if hostname[dot + 1:] in self.allowed_domains:
+                return True
+            dot = hostname.find(".", dot + 1)
+        return False
+
+    def is_valid(self, url: str) -> bool:
+        """ Decides whether a URL should be crawled.
+            Args:
+                url - the URL to validate
+            Returns: bool - True if the URL should be crawled, False if otherwise
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            return False
+        # if http appears again in the path --> malformed URL
+        if "http" in parsed.path:
+            return False
+        hostname = parsed.hostname
+        if not hostname or not self._allowed_host(hostname):
+            return False
+        if len(url) > self.max_url_length:
+            return False
+        if url.count("?") > self.max_questions or url.count("&") > self.max_ampersands:
+            return False
+        if any(trap in hostname for trap in self.host_traps):
+            return False
+        if self._path_re.search(parsed.path.lower()):
+            return False
+        if parsed.query and self._query_re.search(parsed.query.lower()):
+            return False
+        return True
+
+    def is_valid_many(self, urls) -> list:
+        """ Filters a batch of URLs, same results as is_valid. A page's links share a few
+            hosts, so the host checks are done once per netloc of the batch, and URLs
+            are split w urlsplit (urlparse only when a path has ;params to drop).
+            Args:
+                urls - iterable of URLs
+            Returns: list of the URLs that should be crawled, in their original order
+        """
+        hosts = dict() # netloc -> whether its hostname may be crawled
+        path_search, query_search = self._path_re.search, self._query_re.search
+        valid = list()
+        for url in urls:
+            parsed = urlsplit(url)
+            if parsed.scheme not in ("http", "https"):
+                continue
+            path = parsed.path
+            if ";" in path: # urlparse's path stops at the ;params
+                path = urlparse(url).path
+            if "http" in path:
+                continue
+            allowed = hosts.get(parsed.netloc)
+            if allowed is None:
+                hostname = parsed.hostname
+                allowed = hosts[parsed.netloc] = bool(
+                    hostname and self._allowed_host(hostname)
+                    and not any(trap in hostname for trap in self.host_traps))
+            if not allowed:
+                continue
+            if len(url) > self.max_url_length:
+                continue
+            if url.count("?") > self.max_questions or url.count("&") > self.max_ampersands:
+                continue
+            if path_search(path.lower()):
+                continue
+            if parsed.query and query_search(parsed.query.lower()):
+                continue
+            valid.append(url)
+        return valid